@@ -0,0 +1,29 @@
+from django.contrib import admin
+
+from file_and_folder_indexer.apps.file_reader.models import (FileIndex,
+                                                             FolderIndex,
+                                                             IndexingJob)
+
+
+@admin.register(FileIndex)
+class FileIndexAdmin(admin.ModelAdmin):
+    list_display = ('path', 'size', 'encoding', 'total_words_number',
+                    'updated')
+    search_fields = ('path',)
+    exclude = ('unique_words',)
+
+
+@admin.register(FolderIndex)
+class FolderIndexAdmin(admin.ModelAdmin):
+    list_display = ('path', 'number_of_files', 'total_words_number',
+                    'updated')
+    search_fields = ('path',)
+    exclude = ('unique_words',)
+
+
+@admin.register(IndexingJob)
+class IndexingJobAdmin(admin.ModelAdmin):
+    list_display = ('url_path', 'status', 'files_done', 'files_total',
+                    'created')
+    list_filter = ('status',)
+    exclude = ('result',)
@@ -1,9 +1,59 @@
+import os
+
 from django.apps import AppConfig
 
 
 class FileReaderConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'file_and_folder_indexer.apps.file_reader'
-    # allowed_file_extensions = [".txt", ".md", ".docx", ""]
-    allowed_file_extensions = ['.txt', '.docx']
+    # Extensions of files to read, all with registered readers if None
+    allowed_file_extensions = None
+    # Dotted paths of readers by file extensions, e.g.
+    # {'.rst': 'package.module.read_rst'}
+    readers = {}
     encodings_queue = ['utf-8', 'Windows-1251', 'cp932', 'big5']
+    # Number of bytes read from text file at once
+    read_block_size = 1024 * 1024
+    # Min size in bytes of text file to map into memory and count its words
+    # without decoding the whole text, if it is in UTF-8 or single-byte
+    # encoding
+    mmap_min_size = 4 * 1024 * 1024
+    # Max number of worker processes reading files of the folder
+    workers = os.cpu_count() or 1
+    # Min number of bytes of files read by worker process at once
+    batch_size = 16 * 1024 * 1024
+    # Symlinks are listed and files they lead to are read like os.walk does.
+    # Whether to also walk folders symlinks lead to
+    follow_symlinks = False
+    # Whether to skip symlinks, they are neither listed nor read then
+    skip_symlinks = False
+    # Whether to skip subfolders mounted from other file systems
+    same_filesystem = False
+    # Folders kept indexed by 'python manage.py watch_folders'
+    watched_folders = []
+    # Seconds between polls of watched folders or to gather their changes for
+    watch_interval = 1.0
+    # Max number of folder requests handled at once by the async endpoint
+    scan_threads = 2
+    # Max number of file and word requests handled at once by the async
+    # endpoint
+    lookup_threads = 8
+    # Max number and approximate size in bytes of file statistics kept in
+    # memory of every server process
+    file_cache_entries = 1024
+    file_cache_bytes = 64 * 1024 * 1024
+    # Max number and approximate size in bytes of statistics responses kept
+    # in memory of every server process
+    result_cache_entries = 256
+    result_cache_bytes = 64 * 1024 * 1024
+    # Whether statistics requests can ask for stages timings and profiles
+    # with 'debug' query parameter, only with DEBUG setting on if None
+    debug_requests = None
+    # Folder to save profiles of 'debug=profile' requests to, profiles are
+    # only returned in responses if None
+    profiles_folder = None
+    # Max number of background statistics requests run at once
+    job_threads = 2
+    # Seconds after which the lock of a statistics request held by another
+    # server process is considered abandoned
+    lock_timeout = 600
@@ -0,0 +1,280 @@
+import os
+import random
+import time
+import zipfile
+from typing import Callable, Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from django.test import Client
+
+from file_and_folder_indexer.apps.file_reader.cache import (
+    FILE_STATISTICS_CACHE, RESULTS_CACHE)
+from file_and_folder_indexer.apps.file_reader.conversion import convert_to_url
+from file_and_folder_indexer.apps.file_reader.indexer import (
+    Statistics, get_file_statistics, get_folder_statistics, get_objects_list,
+    get_word_statistics)
+from file_and_folder_indexer.apps.file_reader.models import (FileIndex,
+                                                             FolderIndex,
+                                                             WordIndex)
+
+# Seed of generated corpora, so every run reads the same text
+SEED = 0
+# Number of bytes of text generated at once
+TEXT_CHUNK_SIZE = 1024 * 1024
+LATIN_LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+CYRILLIC_LETTERS = 'абвгдеёжзийклмнопрстуфхцчшщъыьэюя'
+SEPARATORS = [' '] * 12 + ['\n', ', ', '. ', ' - ', '; ']
+DOCX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/'
+    'content-types"><Default Extension="rels" ContentType="application/'
+    'vnd.openxmlformats-package.relationships+xml"/><Default Extension="xml"'
+    ' ContentType="application/xml"/><Override PartName="/word/document.xml"'
+    ' ContentType="application/vnd.openxmlformats-officedocument.'
+    'wordprocessingml.document.main+xml"/></Types>')
+DOCX_RELATIONSHIPS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/'
+    'relationships"><Relationship Id="rId1" Type="http://schemas.'
+    'openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/></Relationships>')
+DOCX_NAMESPACE = ('http://schemas.openxmlformats.org/wordprocessingml/2006/'
+                  'main')
+# Corpus name, encoding, alphabet of words, number of files, number of
+# characters in a file and folder depth, sizes are multiplied by the scale
+# of the run
+CORPORA = [
+    ('ascii', 'utf-8', LATIN_LETTERS, 8, 4 * 1024 * 1024, 1),
+    ('cyrillic_cp1251', 'Windows-1251', CYRILLIC_LETTERS, 8,
+     4 * 1024 * 1024, 1),
+    ('cjk', 'utf-8', None, 8, 4 * 1024 * 1024, 1),
+    ('many_small_files', 'utf-8', LATIN_LETTERS, 5000, 2 * 1024, 1),
+    ('huge_files', 'utf-8', LATIN_LETTERS, 2, 32 * 1024 * 1024, 1),
+    ('deep_tree', 'utf-8', LATIN_LETTERS, 90, 16 * 1024, 30),
+    ('docx', 'docx', LATIN_LETTERS, 20, 1024 * 1024, 1),
+]
+
+
+def get_vocabulary(rng: random.Random, alphabet: Optional[str],
+                   size: int = 20000) -> List[str]:
+    """
+    Get random words of the alphabet, CJK words if it is None
+    :param rng: Random numbers generator
+    :param alphabet: Letters of words
+    :param size: Number of words
+    :return: Words
+    """
+    if alphabet is None:
+        return [''.join(chr(rng.randint(0x4E00, 0x9FFF))
+                        for _ in range(rng.randint(1, 3)))
+                for _ in range(size)]
+    return [''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 10)))
+            for _ in range(size)]
+
+
+def generate_text(rng: random.Random, vocabulary: List[str], size: int
+                  ) -> List[str]:
+    """
+    Generate text chunks of words following Zipf-like frequencies
+    :param rng: Random numbers generator
+    :param vocabulary: Words to make the text of, the first are the most
+    frequent
+    :param size: Approximate number of characters
+    :return: Text chunks of at most TEXT_CHUNK_SIZE characters
+    """
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    chunks = []
+    while size > 0:
+        chunk_size = min(size, TEXT_CHUNK_SIZE)
+        words = rng.choices(vocabulary, weights, k=chunk_size // 6 + 1)
+        separators = rng.choices(SEPARATORS, k=len(words))
+        chunk = ''.join(word + separator
+                        for word, separator in zip(words, separators))
+        chunks.append(chunk[:chunk_size])
+        size -= chunk_size
+    return chunks
+
+
+def write_docx(path: str, paragraphs: List[str]) -> None:
+    """
+    Write minimal .docx document
+    :param path: Document path
+    :param paragraphs: Text of paragraphs
+    """
+    body = ''.join(f'<w:p><w:r><w:t xml:space="preserve">{escape(text)}'
+                   f'</w:t></w:r></w:p>' for text in paragraphs)
+    document = (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                f'<w:document xmlns:w="{DOCX_NAMESPACE}"><w:body>{body}'
+                f'</w:body></w:document>')
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as package:
+        package.writestr('[Content_Types].xml', DOCX_CONTENT_TYPES)
+        package.writestr('_rels/.rels', DOCX_RELATIONSHIPS)
+        package.writestr('word/document.xml', document)
+
+
+def generate_corpora(root: str, scale: float = 1.0) -> Dict[str, str]:
+    """
+    Generate text files of every corpus in its folder
+    :param root: Folder to generate corpora in
+    :param scale: Multiplier of corpora sizes
+    :return: Folders of corpora by name
+    """
+    rng = random.Random(SEED)
+    folders = {}
+    for name, encoding, alphabet, files_number, file_size, depth in CORPORA:
+        vocabulary = get_vocabulary(rng, alphabet)
+        files_number = max(1, round(files_number * min(scale, 1)))
+        file_size = max(1, round(file_size * scale))
+        folders[name] = os.path.join(root, name)
+        folder = folders[name]
+        for number in range(files_number):
+            if number and number % (files_number // depth or 1) == 0:
+                folder = os.path.join(folder, f'level_{number}')
+            os.makedirs(folder, exist_ok=True)
+            chunks = generate_text(rng, vocabulary, file_size)
+            if encoding == 'docx':
+                write_docx(os.path.join(folder, f'{number}.docx'),
+                           ''.join(chunks).split('\n'))
+                continue
+            with open(os.path.join(folder, f'{number}.txt'), 'wb') as file:
+                for chunk in chunks:
+                    file.write(chunk.encode(encoding))
+    return folders
+
+
+def get_corpus_size(folder: str) -> Tuple[int, int, str]:
+    """
+    Get number and size of corpus files and its biggest file
+    :param folder: Corpus folder
+    :return: Number of files, their size in bytes and the biggest file path
+    """
+    files = [os.path.join(dirpath, filename)
+             for dirpath, _, filenames in os.walk(folder)
+             for filename in filenames]
+    sizes = {path: os.path.getsize(path) for path in files}
+    return len(files), sum(sizes.values()), max(sizes, key=sizes.get)
+
+
+def reset_indexes() -> None:
+    """Drop all indexes and caches, so the next request reads files"""
+    WordIndex.objects.all().delete()
+    FileIndex.objects.all().delete()
+    FolderIndex.objects.all().delete()
+    FILE_STATISTICS_CACHE.clear()
+    RESULTS_CACHE.clear()
+
+
+def time_call(func: Callable[[], object], repeat: int,
+              cold: bool) -> List[float]:
+    """
+    Time the function
+    :param func: Function to time
+    :param repeat: Number of runs
+    :param cold: Whether to drop indexes and caches before every run,
+    otherwise they are filled by a run before the timed ones
+    :return: Seconds taken by every run
+    """
+    if not cold:
+        func()
+    timings = []
+    for _ in range(repeat):
+        if cold:
+            reset_indexes()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def get_first_word(path: str) -> str:
+    """
+    Get the most frequent word of the text file
+    :param path: Text file path
+    :return: Word
+    """
+    statistics = get_file_statistics(path, Statistics(most_recent=True))
+    return statistics.most_recent[0]
+
+
+def get_http_statistics(client: Client, path: str) -> None:
+    """
+    Get all statistics of the path through the statistics endpoint
+    :param client: Django test client
+    :param path: Path to request
+    """
+    response = client.get(convert_to_url(f'/api/filesystem/{path}/'))
+    if response.status_code != 200:
+        raise RuntimeError(f'Request of {path} failed with '
+                           f'{response.status_code} status code.')
+
+
+def run_benchmarks(folders: Dict[str, str], repeat: int = 3,
+                   workers: int = None) -> List[Dict]:
+    """
+    Time listing, file, word and folder statistics and the statistics
+    endpoint on every corpus with empty and filled indexes
+    :param folders: Folders of corpora by name
+    :param repeat: Number of timed runs of every benchmark
+    :param workers: Max number of worker processes to read files with
+    :return: Results of benchmarks
+    """
+    client = Client()
+    results = []
+    for name, folder in folders.items():
+        files_number, size, biggest_file = get_corpus_size(folder)
+        word_path = os.path.join(biggest_file, get_first_word(biggest_file))
+        benchmarks = [
+            ('get_objects_list', lambda: get_objects_list(folder),
+             files_number, size, [False]),
+            ('get_file_statistics',
+             lambda: get_file_statistics(biggest_file, Statistics()),
+             1, os.path.getsize(biggest_file), [True, False]),
+            ('get_word_statistics',
+             lambda: get_word_statistics(word_path, Statistics()),
+             1, os.path.getsize(biggest_file), [True, False]),
+            ('get_folder_statistics',
+             lambda: get_folder_statistics(folder, Statistics(),
+                                           workers=workers),
+             files_number, size, [True, False]),
+            ('filesystem_view', lambda: get_http_statistics(client, folder),
+             files_number, size, [True, False]),
+        ]
+        for benchmark, func, files, bytes_read, states in benchmarks:
+            for cold in states:
+                timings = time_call(func, repeat, cold)
+                seconds = min(timings)
+                results.append({
+                    'corpus': name,
+                    'benchmark': benchmark,
+                    'state': 'cold' if cold else 'warm',
+                    'files': files,
+                    'bytes': bytes_read,
+                    'seconds': seconds,
+                    'timings': timings,
+                    'mb_per_s': bytes_read / 1024 ** 2 / seconds
+                    if seconds else None,
+                    'files_per_s': files / seconds if seconds else None,
+                })
+    return results
+
+
+def compare_results(old_results: List[Dict], new_results: List[Dict]
+                    ) -> List[Tuple[str, float, float, float]]:
+    """
+    Compare best timings of benchmarks present in both results
+    :param old_results: Results of the previous run
+    :param new_results: Results of the current run
+    :return: Benchmark names, old and new seconds and speedups
+    """
+    def get_name(result: Dict) -> str:
+        return f"{result['corpus']}.{result['benchmark']}.{result['state']}"
+
+    old_seconds = {get_name(result): result['seconds']
+                   for result in old_results}
+    comparison = []
+    for result in new_results:
+        name = get_name(result)
+        if name in old_seconds and result['seconds']:
+            comparison.append((name, old_seconds[name], result['seconds'],
+                               old_seconds[name] / result['seconds']))
+    return comparison
@@ -0,0 +1,112 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable
+
+from file_and_folder_indexer.apps.file_reader.apps import FileReaderConfig
+
+
+def get_size(value: Any) -> int:
+    """
+    Get approximate size of the value together with values it holds
+    :param value: Value to measure
+    :return: Size in bytes
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(get_size(key) + get_size(item)
+                    for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(map(get_size, value))
+    elif hasattr(value, '__dict__'):
+        size += get_size(value.__dict__)
+    return size
+
+
+class LRUCache:
+    """Keeps least recently used values while their number and approximate
+    size fit the limits. Counts hits, misses and evictions"""
+
+    def __init__(self, max_entries: int, max_bytes: int) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries: OrderedDict = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get value of the key and mark it as recently used
+        :param key: Cache key
+        :param default: Value returned if the key is not cached
+        :return: Cached value or default
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Cache value of the key evicting least recently used values if limits
+        are exceeded. Values bigger than the whole cache are not cached
+        :param key: Cache key
+        :param value: Value to cache
+        """
+        size = get_size(value)
+        with self.lock:
+            old_entry = self.entries.pop(key, None)
+            if old_entry is not None:
+                self.bytes -= old_entry[1]
+            if size > self.max_bytes or self.max_entries < 1:
+                return
+            self.entries[key] = (value, size)
+            self.bytes += size
+            while (len(self.entries) > self.max_entries or
+                   self.bytes > self.max_bytes):
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all cached values, counters are kept"""
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def info(self) -> Dict[str, int]:
+        """Get counters and current size of the cache"""
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self.entries),
+                'bytes': self.bytes,
+            }
+
+
+# Statistics of files by path and signature, with the plan they cover
+FILE_STATISTICS_CACHE = LRUCache(FileReaderConfig.file_cache_entries,
+                                 FileReaderConfig.file_cache_bytes)
+# Statistics responses by request key and path digest
+RESULTS_CACHE = LRUCache(FileReaderConfig.result_cache_entries,
+                         FileReaderConfig.result_cache_bytes)
+
+
+def get_cache_info() -> Dict[str, Dict[str, int]]:
+    """
+    Get counters and sizes of all caches of the process
+    :return: Cache info by cache name
+    """
+    return {
+        'file_statistics': FILE_STATISTICS_CACHE.info(),
+        'results': RESULTS_CACHE.info(),
+    }
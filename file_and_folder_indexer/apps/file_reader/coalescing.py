@@ -0,0 +1,114 @@
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+from file_and_folder_indexer.apps.file_reader.apps import FileReaderConfig
+from file_and_folder_indexer.apps.file_reader.storage import (acquire_lock,
+                                                              is_locked,
+                                                              release_lock)
+
+# Seconds between checks of the lock held by another process
+LOCK_POLL_INTERVAL = 0.1
+
+
+def get_request_key(path: str, fields: List[str], options: Dict) -> str:
+    """
+    Get key of the statistics request, requests with equal keys get equal
+    statistics
+    :param path: Normalized path
+    :param fields: Requested statistics fields
+    :param options: Keyword arguments of indexate changing statistics
+    :return: Request key
+    """
+    request = json.dumps([path, sorted(fields), options], sort_keys=True)
+    return hashlib.sha256(request.encode()).hexdigest()
+
+
+class SingleFlight:
+    """Runs at most one call per key at once, calls with the key made
+    meanwhile wait for it and share its result or exception"""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.calls: Dict[str, Future] = {}
+
+    def run(self, key: str, func: Callable[[], Any]) -> Any:
+        """
+        Call the function unless a call with the key is in flight
+        :param key: Call key
+        :param func: Function to call
+        :return: Result of the function
+        """
+        with self.lock:
+            future = self.calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self.calls[key] = future
+        if not leader:
+            return future.result()
+
+        try:
+            result = func()
+            future.set_result(result)
+            return result
+        except BaseException as err:
+            future.set_exception(err)
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+
+
+def run_once_across_processes(key: str, func: Callable[[], Any],
+                              timeout: float = None) -> Any:
+    """
+    Call the function holding the lock of the key in the database. If
+    another process holds it, wait until it is released, so the function is
+    called when statistics are already in the index
+    :param key: Call key
+    :param func: Function to call
+    :param timeout: Seconds the lock can be held for,
+    FileReaderConfig.lock_timeout by default
+    :return: Result of the function
+    """
+    timeout = timeout or FileReaderConfig.lock_timeout
+    if acquire_lock(key, timeout):
+        try:
+            return func()
+        finally:
+            release_lock(key)
+
+    deadline = time.monotonic() + timeout
+    while is_locked(key) and time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+    return func()
+
+
+# Statistics requests in flight in this process
+REQUESTS = SingleFlight()
+
+
+def coalesce(key: str, func: Callable[[], Any],
+             version: Optional[str] = None,
+             across_processes: bool = True) -> Any:
+    """
+    Call the function once for all concurrent calls with the key and the
+    version made in this process and once at a time across processes
+    :param key: Call key
+    :param func: Function to call
+    :param version: Version of the requested path, calls made after the
+    path changed neither share results of calls made before nor wait for
+    them in other processes
+    :param across_processes: Whether to hold the lock of the key in the
+    database while the function is called, locks take database writes, so
+    they are worth it only for calls reading many files
+    :return: Result of the function
+    """
+    key = hashlib.sha256(f'{key} {version}'.encode()).hexdigest()
+    if not across_processes:
+        return REQUESTS.run(key, func)
+    return REQUESTS.run(key, lambda: run_once_across_processes(key, func))
@@ -1,3 +1,5 @@
+import base64
+import binascii
 import os
 import re
 from typing import List
@@ -36,3 +38,35 @@ def split_params(params_str: str) -> List:
     if params_list.count(""):
         params_list.remove("")
     return params_list
+
+
+def convert_to_positive_int(value: str) -> int:
+    """
+    Convert URL query parameter string to positive integer
+    :param value: URL query parameter string
+    :return: Positive integer
+    """
+    if not value.isdigit() or not int(value):
+        raise ValueError(f'{value} is not a positive integer.')
+    return int(value)
+
+
+def encode_cursor(last_path: str) -> str:
+    """
+    Convert position in files and folders listing to URL cursor string
+    :param last_path: Path of the last listed file or folder
+    :return: Cursor string
+    """
+    return base64.urlsafe_b64encode(last_path.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> str:
+    """
+    Convert URL cursor string to position in files and folders listing
+    :param cursor: Cursor string
+    :return: Path of the last listed file or folder
+    """
+    try:
+        return base64.urlsafe_b64decode(cursor.encode()).decode()
+    except (binascii.Error, UnicodeError):
+        raise ValueError(f'{cursor} is not a valid cursor.')
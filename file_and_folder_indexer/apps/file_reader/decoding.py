@@ -0,0 +1,62 @@
+import codecs
+import logging
+from typing import BinaryIO, Iterator, List, Optional
+
+# Longer BOMs go first: UTF-32 LE BOM starts with UTF-16 LE BOM
+BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+logger = logging.getLogger(__name__)
+
+
+def detect_encoding(prefix: bytes, encodings: List[str]) -> Optional[str]:
+    """
+    Detect encoding of the text by its byte order mark or by the first
+    encoding from the list that decodes the beginning of the text
+    :param prefix: Beginning of the text
+    :param encodings: Encodings to try in order of priority
+    :return: Encoding name or None if no encoding fits
+    """
+    for bom, encoding in BOMS:
+        if prefix.startswith(bom):
+            return encoding
+    for encoding in encodings:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            # Not final, so a character cut at the end of prefix is fine
+            decoder.decode(prefix)
+        except UnicodeDecodeError as err:
+            logger.debug(f'Text is not in {encoding} encoding:\n{err}')
+            continue
+        return encoding
+    return None
+
+
+class BlockDecoder:
+    """
+    Iterable of text blocks of the binary file. File is read from disk only
+    once: encoding is detected by the first block and all blocks are decoded
+    with incremental decoder
+    """
+
+    def __init__(self, file: BinaryIO, encodings: List[str],
+                 block_size: int) -> None:
+        self.file = file
+        self.encodings = encodings
+        self.block_size = block_size
+        self.encoding = None
+
+    def __iter__(self) -> Iterator[str]:
+        data = self.file.read(self.block_size)
+        self.encoding = detect_encoding(data, self.encodings)
+        if self.encoding is None:
+            raise ValueError(f'None of {self.encodings} encodings fits.')
+        decoder = codecs.getincrementaldecoder(self.encoding)()
+        while data:
+            yield decoder.decode(data)
+            data = self.file.read(self.block_size)
+        yield decoder.decode(b'', final=True)
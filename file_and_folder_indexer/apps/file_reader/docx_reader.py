@@ -0,0 +1,79 @@
+import posixpath
+import zipfile
+from typing import BinaryIO, Iterator
+from xml.etree import ElementTree
+
+WORD_NAMESPACE = ('{http://schemas.openxmlformats.org/wordprocessingml/'
+                  '2006/main}')
+RELATIONSHIPS_NAMESPACE = ('{http://schemas.openxmlformats.org/package/2006/'
+                           'relationships}')
+OFFICE_DOCUMENT_TYPE = ('http://schemas.openxmlformats.org/officeDocument/'
+                        '2006/relationships/officeDocument')
+DEFAULT_DOCUMENT_NAME = 'word/document.xml'
+# Tags of body paragraphs runs, the same ones python-docx reads
+PARAGRAPH_PATH = [WORD_NAMESPACE + 'document', WORD_NAMESPACE + 'body',
+                  WORD_NAMESPACE + 'p', WORD_NAMESPACE + 'r']
+TEXT_TAG = WORD_NAMESPACE + 't'
+# Run elements standing for characters
+RUN_CHARACTERS = {
+    WORD_NAMESPACE + 'tab': '\t',
+    WORD_NAMESPACE + 'br': '\n',
+    WORD_NAMESPACE + 'cr': '\n',
+}
+
+
+def get_document_name(package: zipfile.ZipFile) -> str:
+    """
+    Get name of the main document part from package relationships
+    :param package: Opened .docx package
+    :return: Name of the document part in the package
+    """
+    try:
+        relationships = ElementTree.fromstring(package.read('_rels/.rels'))
+    except (KeyError, ElementTree.ParseError):
+        return DEFAULT_DOCUMENT_NAME
+    for relationship in relationships.iter(
+            RELATIONSHIPS_NAMESPACE + 'Relationship'):
+        if relationship.get('Type') == OFFICE_DOCUMENT_TYPE:
+            return posixpath.normpath(relationship.get('Target').lstrip('/'))
+    return DEFAULT_DOCUMENT_NAME
+
+
+def get_run_text(run: ElementTree.Element) -> str:
+    """
+    Get text of the run with tabs and line breaks
+    :param run: Parsed run element
+    :return: Run text
+    """
+    return ''.join(child.text or '' if child.tag == TEXT_TAG
+                   else RUN_CHARACTERS.get(child.tag, '')
+                   for child in run)
+
+
+def iter_docx_blocks(file: BinaryIO) -> Iterator[str]:
+    """
+    Read text of body paragraphs run by run, parsed runs and paragraphs are
+    dropped once their text is read, so only one run is kept in memory
+    :param file: .docx file opened in binary mode
+    :return: Text of paragraphs runs in order of appearance
+    """
+    try:
+        with zipfile.ZipFile(file) as package:
+            with package.open(get_document_name(package)) as document:
+                path = []
+                for event, element in ElementTree.iterparse(
+                        document, events=('start', 'end')):
+                    if event == 'start':
+                        path.append(element)
+                        continue
+                    if [parent.tag for parent in path] == PARAGRAPH_PATH:
+                        yield get_run_text(element)
+                        element.clear()
+                    path.pop()
+                    if len(path) in (2, 3):
+                        # Body and its paragraphs are left with no parsed
+                        # children, so paragraphs with many runs are not
+                        # kept in memory either
+                        path[-1].remove(element)
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError) as err:
+        raise ValueError(f'File is not a valid .docx file: {err}') from err
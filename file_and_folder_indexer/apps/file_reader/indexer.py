@@ -1,20 +1,40 @@
+import hashlib
 import logging
 import os
-from dataclasses import dataclass, field
-from functools import wraps
-from string import ascii_lowercase
-from typing import Callable, Dict, List, TextIO
-from unicodedata import category
-
-import docx
-from docx.document import Document
-from unidecode import unidecode
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from itertools import islice
+from typing import (Callable, Dict, Iterable, Iterator, List, Mapping,
+                    Optional, Tuple)
 
 from file_and_folder_indexer.apps.file_reader.apps import FileReaderConfig
+from file_and_folder_indexer.apps.file_reader.cache import \
+    FILE_STATISTICS_CACHE
+from file_and_folder_indexer.apps.file_reader.models import (FileIndex,
+                                                             FolderIndex)
+from file_and_folder_indexer.apps.file_reader.planner import (
+    FULL_PLAN, Plan, get_requested_fields, plan_statistics)
+from file_and_folder_indexer.apps.file_reader.readers import get_reader
+from file_and_folder_indexer.apps.file_reader.storage import (
+    load_file_indexes, load_folder_indexes, load_word_count, load_word_counts,
+    save_file_index, save_folder_indexes)
+from file_and_folder_indexer.apps.file_reader.tokenizer import (count_letters,
+                                                                tokenize)
+from file_and_folder_indexer.apps.file_reader.tracing import (count,
+                                                              trace_file,
+                                                              trace_iterator,
+                                                              trace_stage)
+from file_and_folder_indexer.apps.file_reader.vocabulary import WordCounts
+from file_and_folder_indexer.apps.file_reader.walker import (FileSystemEntry,
+                                                             FolderEntries,
+                                                             get_entry, walk,
+                                                             walk_after,
+                                                             walk_tree)
 
-VOWELS = set("aeiou")
-CONSONANTS = set(ascii_lowercase).difference(VOWELS)
 TOP_N = 5
+# Called with numbers of files done and to do and their sizes in bytes
+ProgressCallback = Callable[[int, int, int, int], None]
 logger = logging.getLogger(__name__)
 
 
@@ -22,33 +42,111 @@ logger = logging.getLogger(__name__)
 class Statistics:
     files_and_folders: List = field(default_factory=list)
     number_of_files: int = 0
-    unique_words: Dict = field(default_factory=dict)
+    unique_words: Mapping[str, int] = field(default_factory=WordCounts)
     most_recent: List = field(default_factory=list)
     least_recent: List = field(default_factory=list)
     total_words_number: int = 0
     total_words_length: int = 0
     average_word_length: float = 0.0
     times_in_text: int = 0
+    times_in_files: Dict = field(default_factory=dict)
     vowel_number: int = 0
     consonant_number: int = 0
 
-    def update_unique_words(self, word: str) -> None:
-        """Add new word in dict or increment words counter"""
-        self.unique_words[word] = self.unique_words.get(word, 0) + 1
-
-    def set_recent_words(self) -> None:
-        """Calculate TOP_N most recent and least recent words and set
-        corresponding attribute values"""
-        sorted_words = sorted(
-            self.unique_words,
-            key=self.unique_words.get,
-            reverse=True
+    @classmethod
+    def from_file_index(cls, file_index: FileIndex,
+                        plan: Plan = FULL_PLAN) -> 'Statistics':
+        """
+        Get statistics stored in the file index
+        :param file_index: File index
+        :param plan: Statistics to get, the word frequency table is not
+        loaded unless words are planned
+        :return: Statistics of the file
+        """
+        return cls(
+            unique_words=(WordCounts.from_mapping(file_index.unique_words)
+                          if plan.words else WordCounts()),
+            total_words_number=file_index.total_words_number,
+            total_words_length=file_index.total_words_length,
+            vowel_number=file_index.vowel_number,
+            consonant_number=file_index.consonant_number,
         )
-        most_recent = sorted_words[:TOP_N]
-        least_recent = sorted_words[-TOP_N:]
-        least_recent.reverse()
-        self.most_recent = most_recent
-        self.least_recent = least_recent
+
+    @classmethod
+    def from_folder_index(cls, folder_index: FolderIndex,
+                          plan: Plan = FULL_PLAN) -> 'Statistics':
+        """
+        Get statistics stored in the folder index
+        :param folder_index: Folder index
+        :param plan: Statistics to get, the word frequency table is not
+        loaded unless words are planned
+        :return: Statistics of all files under the folder
+        """
+        statistics = cls.from_file_index(folder_index, plan)
+        statistics.number_of_files = folder_index.number_of_files
+        return statistics
+
+    def copy(self) -> 'Statistics':
+        """Get copy of statistics, so cached statistics are not changed
+        through it. Word frequency tables are not changed once created, so
+        the copy shares the table"""
+        return replace(self)
+
+    def update_unique_words(self, words_counter: Mapping[str, int]) -> None:
+        """Replace the word frequency table with one having new words added
+        and counts of known ones incremented"""
+        if self.unique_words:
+            self.unique_words = WordCounts.merge([self.unique_words,
+                                                  words_counter])
+        else:
+            self.unique_words = WordCounts(words_counter)
+
+    def merge(self, other: 'Statistics') -> None:
+        """
+        Add files, words, vowels and consonants counts of other statistics.
+        Takes time linear in the number of unique words of both statistics,
+        use merge_statistics to merge many statistics at once
+        :param other: Statistics to add
+        """
+        self.update_unique_words(other.unique_words)
+        self.add_counts(other)
+
+    def add_counts(self, other: 'Statistics') -> None:
+        """
+        Add files, vowels and consonants counts and totals of words of other
+        statistics
+        :param other: Statistics to add
+        """
+        self.number_of_files += other.number_of_files
+        self.total_words_number += other.total_words_number
+        self.total_words_length += other.total_words_length
+        self.vowel_number += other.vowel_number
+        self.consonant_number += other.consonant_number
+
+    def assign(self, other: 'Statistics', plan: Plan) -> None:
+        """
+        Set statistics fields gathered by the plan to values of other
+        statistics, other fields keep their values
+        :param other: Gathered statistics
+        :param plan: Plan other statistics were gathered by
+        """
+        if plan.words:
+            self.unique_words = other.unique_words
+        if plan.totals:
+            self.total_words_number = other.total_words_number
+            self.total_words_length = other.total_words_length
+        if plan.letters:
+            self.vowel_number = other.vowel_number
+            self.consonant_number = other.consonant_number
+
+    def set_recent_words(self, top_n: int = TOP_N) -> None:
+        """Calculate top_n most recent and least recent words and set
+        corresponding attribute values. Equally frequent words go in order of
+        appearance for most recent words and in reverse order for least
+        recent words"""
+        words = WordCounts.from_mapping(self.unique_words)
+        self.most_recent = words.get_most_common(top_n)
+        self.least_recent = words.get_least_common(top_n)
 
     def set_average_word_length(self) -> None:
         """Calculate and set average words length attribute value"""
@@ -67,8 +165,11 @@ class Statistics:
         """
         valid_statistics = {}
         for parameter in valid_parameters:
-            if parameter and type(getattr(self, parameter)) is not bool:
-                valid_statistics.update({parameter: getattr(self, parameter)})
+            value = getattr(self, parameter)
+            if parameter and type(value) is not bool:
+                if isinstance(value, WordCounts):
+                    value = value.as_dict()
+                valid_statistics.update({parameter: value})
         if valid_statistics:
             return valid_statistics
         for attr, value in self.__dict__.items():
@@ -91,88 +192,88 @@ def get_objects_list(target_path: str) -> List:
     :param target_path: Path to check
     :return: List of files and folders
     """
-    filesystem = [target_path]
+    return [entry.path for entry in walk(target_path)]
 
-    for root, subdirectories, files in os.walk(target_path):
-        for subdirectory in subdirectories:
-            filesystem.append(os.path.join(root, subdirectory))
-        for file in files:
-            filesystem.append(os.path.join(root, file))
 
-    return filesystem
+def iter_objects(target_path: str, after: str = None,
+                 limit: int = None) -> Iterator[str]:
+    """
+    Get files and folders for the specified path one by one without keeping
+    the whole list in memory
+    :param target_path: Path to check
+    :param after: Path of the last listed file or folder to continue the
+    listing after, the listing starts from the path itself if None
+    :param limit: Max number of files and folders to get
+    :return: Paths of files and folders
+    """
+    if after is None:
+        entries = walk(target_path)
+    else:
+        entries = walk_after(target_path, after)
+    return islice((entry.path for entry in entries), limit)
 
 
-def ignore_kwargs(func: Callable):
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        func_value = func(*args)
-        return func_value
-    return wrapper
+def is_parseable(entry: FileSystemEntry) -> bool:
+    """
+    Check if entry is a file with allowed extension
+    :param entry: File or folder entry
+    :return: Whether the file can be read
+    """
+    return entry.is_file and get_reader(entry.extension) is not None
 
 
-def get_next_char(file: TextIO) -> str:
+def get_parseable_files(entries: Iterable[FileSystemEntry]
+                        ) -> List[FileSystemEntry]:
     """
-    Read next character from file
-    :param file: Opened file
+    Get files with allowed extensions
+    :param entries: Files and folders entries
+    :return: Entries of files to read
     """
-    while True:
-        char = file.read(1)
-        if not char:
-            break
-        yield char
+    return [entry for entry in entries if is_parseable(entry)]
 
 
-def get_next_docx_char(doc: Document) -> str:
+def get_encodings_queue(encoding: Optional[str] = None) -> List[str]:
     """
-    Read next character from file
-    :param doc: Opened .docx file
+    Get encodings to try for reading the file
+    :param encoding: Encoding the file was successfully read with last time
+    :return: Encodings in order of priority
     """
-    for paragraph in doc.paragraphs:
-        for char in paragraph.text:
-            yield char
+    encodings_queue = FileReaderConfig.encodings_queue
+    if not encoding:
+        return encodings_queue
+    return [encoding] + [enc for enc in encodings_queue if enc != encoding]
 
 
 class FileManager:
-    def __init__(self, filepath, mode='r', encoding='utf-8'):
+    def __init__(self, filepath, mode='rb', encodings=None):
         self.filepath = filepath
         self.file_ext = os.path.splitext(self.filepath)[1]
         self.mode = mode
-        self.encoding = encoding
+        self.encodings = encodings or FileReaderConfig.encodings_queue
         self.file = None
-        self.context = None
-        self.opener = None
         self.reader = None
 
     def __enter__(self):
-        if self.file_ext not in self.Context.extensions:
+        self.reader = get_reader(self.file_ext)
+        if self.reader is None:
             raise FileSystemException('File extension is not in allowed '
                                       'extensions list.')
-        self.context = self.Context.extensions.get(self.file_ext)
-        self.opener = self.context.get('opener')
-        self.reader = self.context.get('reader')
-
-        self.file = self.opener(self.filepath, encoding=self.encoding)
+        self.file = open(self.filepath, mode=self.mode)
         return self
 
-    def __exit__(self, exc_type, exc_value, exc_traceback):
-        if self.opener is self.Context.txt_opener:
-            self.file.close()
+    def read(self) -> Iterable[str]:
+        """Get text blocks of the opened file"""
+        return self.reader(self.file, self.encodings)
 
-    @dataclass
-    class Context:
-        docx_opener = ignore_kwargs(docx.Document)
-        docx_reader = get_next_docx_char
-        txt_opener = open
-        txt_reader = get_next_char
-        extensions = {
-            '.txt': {'opener': txt_opener, 'reader': txt_reader},
-            '.docx': {'opener': docx_opener, 'reader': docx_reader},
-        }
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.file.close()
 
 
 def get_word_statistics(path: str, statistics: Statistics) -> type(Statistics):
     """
-    Get number of vowels and consonants in word
+    Get number of vowels and consonants in word and number of times it meets
+    in the text file. Word is looked up in the word index of the file, so
+    the file is read only if it was changed since the last indexing
     :param path: Path to the word in text file
     :param statistics: Requested information
     :return: Dict of 2 values: the number of vowels and the number of
@@ -180,131 +281,572 @@ def get_word_statistics(path: str, statistics: Statistics) -> type(Statistics):
     """
     word = os.path.split(path)[-1]
     path = os.path.dirname(path)
-    file_statistics = get_file_statistics(path, Statistics())
-    statistics.times_in_text = file_statistics.unique_words.get(word, 0)
-
-    statistics.vowel_number = 0
-    statistics.consonant_number = 0
-    for char in word:
-        ascii_char = unidecode(char.lower())
-        if ascii_char in VOWELS:
-            statistics.vowel_number += 1
-        elif ascii_char in CONSONANTS:
-            statistics.consonant_number += 1
+    plan = plan_statistics(get_requested_fields(statistics))
+    if plan.words:
+        file_index = index_files([get_entry(path)], words=False,
+                                 plan=plan).get(path)
+        statistics.times_in_text = (load_word_count(file_index, word)
+                                    if file_index else 0)
+
+    statistics.vowel_number, statistics.consonant_number = count_letters(word)
 
     return statistics
 
 
-def get_file_statistics(path: str,
-                        statistics: Statistics) -> type(Statistics):
+def get_folder_word_statistics(root_path: str, word: str,
+                               statistics: Statistics,
+                               workers: int = None,
+                               on_progress: ProgressCallback = None,
+                               folder_tree: 'FolderTree' = None
+                               ) -> type(Statistics):
     """
-    Reads specified text file by char
-    :param path: File path
+    Get number of vowels and consonants in word and number of times it meets
+    in every text file under the folder
+    :param root_path: Folder path
+    :param word: Word to look up
     :param statistics: Requested information
-    :return: Dict of 3 values: dict of unique words, vowels number and
-    consonants number
+    :param workers: Max number of worker processes to read changed files
+    with, FileReaderConfig.workers by default
+    :param on_progress: Called every time a file is read
+    :param folder_tree: Folder walked already, the folder is walked if it is
+    not given
+    :return: Statistics with number of times the word meets in the folder
+    files by file path
     """
-    word = ''
-    encodings_queue = FileReaderConfig.encodings_queue
-    for encoding in encodings_queue:
-        try:
-            with FileManager(path, encoding=encoding) as fi:
-                for char in fi.reader(fi.file):
-                    # If character is an any unicode Letter character
-                    if category(char).startswith("L"):
-                        word += char
-                        ascii_char = set(unidecode(char.lower()))
-                        if ascii_char.issubset(VOWELS):
-                            statistics.vowel_number += 1
-                        elif ascii_char.issubset(CONSONANTS):
-                            statistics.consonant_number += 1
-                    elif word:
-                        statistics.update_unique_words(word)
-                        statistics.total_words_number += 1
-                        statistics.total_words_length += len(word)
-                        word = ""
-                # If word buffer is not empty
-                if word:
-                    statistics.update_unique_words(word)
-                    statistics.total_words_number += 1
-                    statistics.total_words_length += len(word)
-
-                statistics.set_recent_words()
-                statistics.set_average_word_length()
+    plan = plan_statistics(get_requested_fields(statistics))
+    if plan.words:
+        if folder_tree is not None:
+            entries = (file for _, _, files in folder_tree.folders
+                       for file in files)
+        else:
+            entries = walk(root_path)
+        files = get_parseable_files(entries)
+        file_indexes = index_files(files, workers or FileReaderConfig.workers,
+                                   words=False, plan=plan,
+                                   on_progress=on_progress)
+        counts = load_word_counts(root_path, file_indexes.values(), word)
+        statistics.times_in_files = {file.path: counts[file.path]
+                                     for file in files if file.path in counts}
+        statistics.times_in_text = sum(statistics.times_in_files.values())
+
+    statistics.vowel_number, statistics.consonant_number = count_letters(word)
 
-                break
+    return statistics
+
+
+def read_file_statistics(path: str, encodings_queue: List[str],
+                         plan: Plan = FULL_PLAN
+                         ) -> Tuple[Optional[Statistics], Optional[str]]:
+    """
+    Reads specified text file by blocks
+    :param path: File path
+    :param encodings_queue: Encodings to try in order of priority
+    :param plan: Statistics to gather, all by default
+    :return: Statistics of the file and encoding it was read with or None
+    if file could not be read with any encoding
+    """
+    while encodings_queue:
+        statistics = Statistics()
+        blocks = None
+        try:
+            with FileManager(path, encodings=encodings_queue) as fi:
+                blocks = fi.read()
+                tokenize(blocks, statistics, plan)
         except ValueError as err:
+            encoding = getattr(blocks, 'encoding', None)
             logger.warning(f'Reading file in {path} with {encoding} encoding '
                            f'failed:\n{err}')
+            # Text is valid in the encoding only at the beginning, so file
+            # has to be read again with the next encodings
+            if encoding not in encodings_queue:
+                break
+            encodings_queue = encodings_queue[
+                encodings_queue.index(encoding) + 1:]
+            continue
+        return statistics, getattr(blocks, 'encoding', None) or ''
+    return None, None
+
+
+def read_files_batch(batch: List[Tuple[str, Tuple, List[str], Plan]]
+                     ) -> List[Tuple[str, Tuple, Optional[Statistics], str,
+                                     Plan, float]]:
+    """
+    Read statistics of a batch of files. Is called in worker processes
+    :param batch: Paths, signatures, encodings queues and plans of files to
+    read
+    :return: Paths, signatures, statistics, encodings, plans of read files
+    and seconds taken to read them
+    """
+    results = []
+    for path, signature, encodings_queue, plan in batch:
+        start = time.perf_counter()
+        file_statistics, encoding = read_file_statistics(
+            path, encodings_queue, plan)
+        results.append((path, signature, file_statistics, encoding, plan,
+                        time.perf_counter() - start))
+    return results
+
+
+def split_into_batches(files: List[Tuple[str, Tuple, List[str], Plan]]
+                       ) -> List[List[Tuple[str, Tuple, List[str], Plan]]]:
+    """
+    Group small files together, so every batch has at least
+    FileReaderConfig.batch_size bytes of files except the last one
+    :param files: Paths, signatures, encodings queues and plans of files to
+    read
+    :return: List of batches
+    """
+    batches = []
+    batch = []
+    batch_size = 0
+    for file in files:
+        batch.append(file)
+        batch_size += file[1][0]
+        if batch_size >= FileReaderConfig.batch_size:
+            batches.append(batch)
+            batch = []
+            batch_size = 0
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def read_files(files: List[Tuple[str, Tuple, List[str], Plan]],
+               workers: int = 1) -> Iterator[Tuple]:
+    """
+    Read statistics of files in the process pool if there is more than one
+    batch of files to read and more than one worker, else in current process
+    :param files: Paths, signatures, encodings queues and plans of files to
+    read
+    :param workers: Max number of worker processes
+    :return: Paths, signatures, statistics, encodings, plans of read files
+    and seconds taken to read them
+    """
+    batches = split_into_batches(files)
+    if workers <= 1 or len(batches) <= 1:
+        for batch in batches:
+            yield from read_files_batch(batch)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as pool:
+        for results in pool.map(read_files_batch, batches):
+            yield from results
+
+
+def index_files(files: List[FileSystemEntry], workers: int = 1,
+                words: bool = True, plan: Plan = FULL_PLAN,
+                on_progress: ProgressCallback = None) -> Dict[str, FileIndex]:
+    """
+    Get indexes of text files and read files changed since the last indexing
+    or indexed without statistics needed by the plan
+    :param files: Files entries
+    :param workers: Max number of worker processes to read files with
+    :param words: Whether to load word frequency tables of unchanged files
+    right away
+    :param plan: Statistics the indexes have to contain, all by default
+    :param on_progress: Called once files to read are found and every time
+    a file is read
+    :return: Indexes of successfully read files by path
+    """
+    with trace_stage('index_lookup'):
+        stored_indexes = load_file_indexes([file.path for file in files],
+                                           words=words)
+    file_indexes = {}
+    unread_files = []
+    for file in files:
+        file_index = stored_indexes.get(file.path)
+        if file_index and file_index.signature == file.signature:
+            if file_index.plan.covers(plan):
+                file_indexes[file.path] = file_index
+                continue
+            # Statistics stored for the unchanged file are kept
+            file_plan = plan.union(file_index.plan)
+        else:
+            file_plan = plan
+        encoding = file_index.encoding if file_index else None
+        unread_files.append((file.path, file.signature,
+                             get_encodings_queue(encoding), file_plan))
+
+    files_total = len(files)
+    bytes_total = sum(file.size for file in files)
+    files_done = files_total - len(unread_files)
+    bytes_done = bytes_total - sum(signature[0]
+                                   for _, signature, _, _ in unread_files)
+    count('files_from_index', files_done)
+    if on_progress:
+        on_progress(files_done, files_total, bytes_done, bytes_total)
+    encodings_queues = {path: queue for path, _, queue, _ in unread_files}
+    for (path, signature, file_statistics, encoding, file_plan,
+         seconds) in trace_iterator('read', read_files(unread_files, workers)):
+        queue = encodings_queues[path]
+        trace_file(path, signature[0], seconds, encoding,
+                   queue.index(encoding) + 1 if encoding in queue else
+                   1 if encoding is not None else len(queue))
+        if file_statistics is not None:
+            with trace_stage('save'):
+                file_indexes[path] = save_file_index(
+                    path, signature, encoding, file_statistics, file_plan)
+        files_done += 1
+        bytes_done += signature[0]
+        if on_progress:
+            on_progress(files_done, files_total, bytes_done, bytes_total)
+    return file_indexes
+
+
+def collect_files_statistics(files: List[FileSystemEntry], workers: int = 1,
+                             plan: Plan = FULL_PLAN,
+                             on_progress: ProgressCallback = None
+                             ) -> Dict[str, Statistics]:
+    """
+    Get statistics of text files from the memory cache or the index and read
+    files changed since the last indexing
+    :param files: Files entries
+    :param workers: Max number of worker processes to read files with
+    :param plan: Statistics to gather, all by default
+    :param on_progress: Called every time a file is read
+    :return: Statistics of successfully read files by path
+    """
+    files_statistics = {}
+    uncached_files = []
+    for file in files:
+        cached = FILE_STATISTICS_CACHE.get((file.path, file.signature))
+        if cached is not None and cached[0].covers(plan):
+            files_statistics[file.path] = cached[1].copy()
+        else:
+            uncached_files.append(file)
+    count('file_cache_hits', len(files_statistics))
+    count('file_cache_misses', len(uncached_files))
+
+    file_indexes = index_files(uncached_files, workers, words=plan.words,
+                               plan=plan, on_progress=on_progress)
+    for path, file_index in file_indexes.items():
+        file_statistics = Statistics.from_file_index(file_index, plan)
+        FILE_STATISTICS_CACHE.put((path, file_index.signature),
+                                  (plan, file_statistics))
+        files_statistics[path] = file_statistics.copy()
+    return files_statistics
+
+
+def merge_statistics(statistics_list: Iterable[Statistics]) -> Statistics:
+    """
+    Sum counts of any number of files or folders statistics
+    :param statistics_list: Statistics to sum in order of appearance
+    :return: New statistics with summed counts
+    """
+    statistics_list = list(statistics_list)
+    merged = Statistics(unique_words=WordCounts.merge(
+        statistics.unique_words for statistics in statistics_list))
+    for statistics in statistics_list:
+        merged.add_counts(statistics)
+    return merged
+
+
+def get_file_statistics(path: str, statistics: Statistics,
+                        top_n: int = TOP_N,
+                        on_progress: ProgressCallback = None
+                        ) -> type(Statistics):
+    """
+    Get statistics of the text file from the index or read the file if it
+    was changed since the last indexing
+    :param path: File path
+    :param statistics: Requested information
+    :param top_n: Number of most and least recent words
+    :param on_progress: Called when the file is read
+    :return: Statistics with word frequency table, vowels number and
+    consonants number of the file
+    """
+    plan = plan_statistics(get_requested_fields(statistics))
+    file_statistics = collect_files_statistics(
+        [get_entry(path)], plan=plan, on_progress=on_progress).get(path)
+    if file_statistics is None:
+        return statistics
+
+    statistics.assign(file_statistics, plan)
+    if plan.words:
+        with trace_stage('rank'):
+            statistics.set_recent_words(top_n)
+    if plan.totals:
+        statistics.set_average_word_length()
     return statistics
 
 
-def get_folder_statistics(root_path: os.path,
-                          statistics: Statistics) -> type(Statistics):
+def get_folder_digest(subfolders: List[FileSystemEntry],
+                      files: List[FileSystemEntry],
+                      digests: Dict[str, str]) -> str:
+    """
+    Hash signatures of the folder text files and digests of its walked
+    subfolders, so the digest changes whenever any file under the folder does
+    :param subfolders: Subfolders entries
+    :param files: Files entries
+    :param digests: Digests of walked subfolders by path
+    :return: Folder digest
+    """
+    digest = hashlib.sha256()
+    for file in files:
+        name = os.path.basename(file.path)
+        if is_parseable(file):
+            digest.update(f'f {name!r} {file.signature}\n'.encode())
+        elif file.is_file:
+            digest.update(f'o {name!r}\n'.encode())
+    for subfolder in subfolders:
+        name = os.path.basename(subfolder.path)
+        subfolder_digest = digests.get(subfolder.path, '-')
+        digest.update(f'd {name!r} {subfolder_digest}\n'.encode())
+    return digest.hexdigest()
+
+
+def get_folder_digests(tree: List[FolderEntries]) -> Dict[str, str]:
+    """
+    Get digests of all walked folders
+    :param tree: Walked folders with their subfolders and files, the root
+    folder goes first
+    :return: Digests by folder path
+    """
+    digests = {}
+    # Subfolders go after their folder, so they are hashed first
+    for folder, subfolders, files in reversed(tree):
+        digests[folder.path] = get_folder_digest(subfolders, files, digests)
+    return digests
+
+
+@dataclass
+class FolderTree:
+    """Folder walked once with digests of all its folders, so a request
+    checks the version of the folder and gathers its statistics with a
+    single walk"""
+    folders: List[FolderEntries]
+    digests: Dict[str, str]
+
+    @property
+    def digest(self) -> str:
+        """Digest of the walked folder"""
+        return self.digests[self.folders[0][0].path]
+
+
+def walk_folder(path: str) -> Optional[FolderTree]:
+    """
+    Walk the folder and get digests of its folders without reading any file
+    :param path: Folder path
+    :return: Walked folder or None if path is not a folder
+    """
+    try:
+        if not os.path.isdir(path):
+            return None
+        folders = list(trace_iterator('walk', walk_tree(path)))
+    except OSError:
+        return None
+    with trace_stage('digest'):
+        return FolderTree(folders, get_folder_digests(folders))
+
+
+def get_path_version(path: str, folder_tree: FolderTree = None
+                     ) -> Optional[str]:
+    """
+    Get version of the file or of everything under the folder without
+    reading any file
+    :param path: Path to check, word in the text file is checked as the file
+    :param folder_tree: Folder of the path walked already, the folder is
+    walked if it is not given
+    :return: Digest changing with every change under the path or None if
+    path does not exist
+    """
+    if folder_tree is None and os.path.isdir(path):
+        folder_tree = walk_folder(path)
+    if folder_tree is not None:
+        return folder_tree.digest
+    try:
+        if not os.path.isfile(path):
+            path = os.path.dirname(path)
+        entry = get_entry(path)
+    except OSError:
+        return None
+    if not entry.is_file:
+        return None
+    return str(entry.signature)
+
+
+def rollup_folders(tree: List[FolderEntries], workers: int = 1,
+                   plan: Plan = FULL_PLAN,
+                   on_progress: ProgressCallback = None,
+                   digests: Dict[str, str] = None) -> Statistics:
+    """
+    Get statistics of the folder by merging statistics of its files and
+    subfolders. Statistics of subfolders are taken from the index unless
+    their digests changed, so only folders on the way from changed files to
+    the root are merged again
+    :param tree: Walked folders with their subfolders and files, the root
+    folder goes first
+    :param workers: Max number of worker processes to read files with
+    :param plan: Statistics to gather, all by default
+    :param on_progress: Called every time a file of changed folders is read
+    :param digests: Digests of the walked folders if they are got already
+    :return: Statistics of all files under the root folder
+    """
+    if digests is None:
+        with trace_stage('digest'):
+            digests = get_folder_digests(tree)
+    with trace_stage('index_lookup'):
+        folder_indexes = load_folder_indexes(list(digests))
+    rollups: Dict[str, Statistics] = {}
+    changed_folders = []
+    unchanged_paths = set()
+    for folder, subfolders, files in tree:
+        if folder.path in unchanged_paths:
+            unchanged_paths.update(subfolder.path for subfolder in subfolders)
+            continue
+        folder_index = folder_indexes.get(folder.path)
+        if (folder_index and folder_index.digest == digests[folder.path] and
+                folder_index.plan.covers(plan)):
+            rollups[folder.path] = Statistics.from_folder_index(folder_index,
+                                                                plan)
+            unchanged_paths.update(subfolder.path for subfolder in subfolders)
+        else:
+            changed_folders.append((folder, subfolders, files))
+    count('folders_from_index', len(tree) - len(changed_folders))
+
+    files_statistics = collect_files_statistics(
+        get_parseable_files(file for _, _, files in changed_folders
+                            for file in files), workers, plan, on_progress)
+    # Files of the folder go before files of its subfolders, so merged words
+    # keep the listing order
+    with trace_stage('merge'):
+        for folder, subfolders, files in reversed(changed_folders):
+            folder_statistics = merge_statistics(
+                [files_statistics[file.path] for file in files
+                 if file.path in files_statistics] +
+                [rollups[subfolder.path] for subfolder in subfolders
+                 if subfolder.path in rollups])
+            folder_statistics.number_of_files += len(
+                [file for file in files if file.is_file])
+            rollups[folder.path] = folder_statistics
+    with trace_stage('save'):
+        save_folder_indexes([(folder.path, digests[folder.path],
+                              rollups[folder.path])
+                             for folder, _, _ in changed_folders], plan)
+
+    root = tree[0][0]
+    return rollups[root.path]
+
+
+def collect_folder_statistics(root_path: str, workers: int = 1,
+                              plan: Plan = FULL_PLAN) -> Statistics:
+    """
+    Get statistics of all text files under the folder from the index and
+    read files changed since the last indexing
+    :param root_path: Folder path
+    :param workers: Max number of worker processes to read files with
+    :param plan: Statistics to gather, all by default
+    :return: Statistics of the folder
+    """
+    return rollup_folders(list(walk_tree(root_path)), workers, plan)
+
+
+def get_folder_statistics(root_path: os.path, statistics: Statistics,
+                          workers: int = None, top_n: int = TOP_N,
+                          on_progress: ProgressCallback = None,
+                          folder_tree: FolderTree = None
+                          ) -> type(Statistics):
     """
     Iterates through all subfolders and files
     :param root_path: Folder path
     :param statistics: Requested information types
+    :param workers: Max number of worker processes to read files with,
+    FileReaderConfig.workers by default
+    :param top_n: Number of most and least recent words
+    :param on_progress: Called every time a file is read
+    :param folder_tree: Folder walked already, the folder is walked if it is
+    not given
     :return:
     """
-    parse_files = not any([val for param, val in statistics.__dict__.items()])
-    for param, val in statistics.__dict__.items():
-        if val and param not in ['files_and_folders', 'number_of_files']:
-            parse_files = True
-            break
-
-    files_and_folders = get_objects_list(root_path)
-    statistics.files_and_folders = files_and_folders
-    statistics.number_of_files = len([file for file in files_and_folders
-                                      if os.path.isfile(file)])
-
-    if not parse_files:
+    plan = plan_statistics(get_requested_fields(statistics))
+    files_and_folders = []
+    number_of_files = 0
+    tree = []
+    # Only the entries needed by the plan are kept
+    if folder_tree is not None:
+        folders = folder_tree.folders
+    else:
+        folders = trace_iterator('walk', walk_tree(root_path))
+    for folder, subfolders, files in folders:
+        if plan.listing:
+            if not files_and_folders:
+                files_and_folders.append(folder.path)
+            files_and_folders.extend(entry.path for entry in subfolders)
+            files_and_folders.extend(entry.path for entry in files)
+        number_of_files += len([file for file in files if file.is_file])
+        if plan.parse:
+            tree.append((folder, subfolders, files))
+    if plan.listing:
+        statistics.files_and_folders = files_and_folders
+    if plan.files:
+        statistics.number_of_files = number_of_files
+
+    if not plan.parse:
         return statistics
 
-    statistics.unique_words = {}
-    statistics.vowel_number = 0
-    statistics.consonant_number = 0
-    statistics.total_words_number = 0
-    statistics.total_words_length = 0
-    for path in statistics.files_and_folders:
-        if os.path.isfile(path):
-            file_ext = os.path.splitext(path)[1]
-            if file_ext in FileReaderConfig.allowed_file_extensions:
-                file_statistics = get_file_statistics(path, Statistics())
-                statistics.unique_words.update(file_statistics.unique_words)
-                statistics.vowel_number += file_statistics.vowel_number
-                statistics.consonant_number += file_statistics.consonant_number
-                statistics.total_words_number += (
-                    file_statistics.total_words_number)
-                statistics.total_words_length += (
-                    file_statistics.total_words_length)
-
-    statistics.set_recent_words()
-    statistics.set_average_word_length()
+    folder_statistics = rollup_folders(
+        tree, workers or FileReaderConfig.workers, plan, on_progress,
+        folder_tree.digests if folder_tree is not None else None)
+    statistics.assign(folder_statistics, plan)
+
+    if plan.words:
+        with trace_stage('rank'):
+            statistics.set_recent_words(top_n)
+    if plan.totals:
+        statistics.set_average_word_length()
 
     return statistics
 
 
-def indexate(path: os.path, statistics: Statistics) -> type(Statistics):
+def indexate(path: os.path, statistics: Statistics, workers: int = None,
+             top_n: int = TOP_N, word: str = None,
+             on_progress: ProgressCallback = None,
+             folder_tree: FolderTree = None) -> type(Statistics):
     """
     Get statistics from specified path
     :param path: Path to check
     :param statistics: Statistics to gather
+    :param workers: Max number of worker processes to read folder files with
+    :param top_n: Number of most and least recent words
+    :param word: Word to look up in every file of the folder
+    :param on_progress: Called every time a file is read
+    :param folder_tree: Folder of the path walked already
     """
+    target = get_path_target(path)
+    if target is None:
+        raise FileSystemException('No such file or directory.')
+
     valid_parameters = [param for param, value in statistics.__dict__.items()
                         if value]
-    if os.path.isdir(path):
-        info = get_folder_statistics(path, statistics)
-        info = info.validate_as_dict(valid_parameters)
-        return info
-    elif os.path.isfile(path):
-        info = get_file_statistics(path, statistics)
-        info = info.validate_as_dict(valid_parameters)
-        return info
-    elif os.path.isfile(os.path.dirname(path)):
+    if target == 'folder' and word:
+        info = get_folder_word_statistics(path, word, statistics,
+                                          workers=workers,
+                                          on_progress=on_progress,
+                                          folder_tree=folder_tree)
+    elif target == 'folder':
+        info = get_folder_statistics(path, statistics, workers=workers,
+                                     top_n=top_n, on_progress=on_progress,
+                                     folder_tree=folder_tree)
+    elif target == 'file':
+        info = get_file_statistics(path, statistics, top_n=top_n,
+                                   on_progress=on_progress)
+    else:
         info = get_word_statistics(path, statistics)
-        if info:
-            info = info.validate_as_dict(valid_parameters)
-            return info
-        raise FileSystemException('No such word in file.')
-    raise FileSystemException('No such file or directory.')
+        if not info:
+            raise FileSystemException('No such word in file.')
+    return info.validate_as_dict(valid_parameters)
+
+
+def get_path_target(path: str) -> Optional[str]:
+    """
+    Get type of the requested path
+    :param path: Path to check
+    :return: 'folder', 'file' or 'word' in the text file, None if path does
+    not exist
+    """
+    if os.path.isdir(path):
+        return 'folder'
+    if os.path.isfile(path):
+        return 'file'
+    if os.path.isfile(os.path.dirname(path)):
+        return 'word'
+    return None
@@ -0,0 +1,90 @@
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict
+
+from django.db import DatabaseError, close_old_connections
+
+from file_and_folder_indexer.apps.file_reader.apps import FileReaderConfig
+from file_and_folder_indexer.apps.file_reader.models import IndexingJob
+
+# Min number of seconds between saves of the job progress
+PROGRESS_INTERVAL = 0.5
+# Runs jobs in the server process, files are read by worker processes
+JOB_EXECUTOR = ThreadPoolExecutor(max_workers=FileReaderConfig.job_threads,
+                                  thread_name_prefix='job')
+logger = logging.getLogger(__name__)
+
+
+class JobProgress:
+    """Saves the number of files and bytes done by the job, at most once in
+    PROGRESS_INTERVAL seconds"""
+
+    def __init__(self, job: IndexingJob) -> None:
+        self.job = job
+        self.saved = 0.0
+
+    def __call__(self, files_done: int, files_total: int, bytes_done: int,
+                 bytes_total: int) -> None:
+        self.job.files_done = files_done
+        self.job.files_total = files_total
+        self.job.bytes_done = bytes_done
+        self.job.bytes_total = bytes_total
+        now = time.monotonic()
+        if files_done < files_total and now - self.saved < PROGRESS_INTERVAL:
+            return
+        self.job.save(update_fields=['files_done', 'files_total',
+                                     'bytes_done', 'bytes_total', 'updated'])
+        self.saved = now
+
+
+def run_job(job: IndexingJob, task: Callable[[JobProgress], Dict]) -> None:
+    """
+    Run the task and save its result or error in the job
+    :param job: Pending job
+    :param task: Gets statistics reporting progress to the given callback
+    """
+    try:
+        try:
+            job.status = IndexingJob.RUNNING
+            job.save(update_fields=['status', 'updated'])
+            job.result = task(JobProgress(job))
+            job.status = IndexingJob.DONE
+            job.save()
+        except Exception as err:
+            # Job must not stay pending or running whatever goes wrong,
+            # including failed saves of its status
+            logger.exception(f'Job {job.pk} failed')
+            job.error = str(err)
+            job.status = IndexingJob.FAILED
+            try:
+                job.save(update_fields=['status', 'error', 'updated'])
+            except DatabaseError:
+                logger.exception(f'Saving failure of job {job.pk} failed')
+    finally:
+        close_old_connections()
+
+
+def log_job_error(future: Future) -> None:
+    """
+    Log error of the job thread not handled by run_job, nothing else reads
+    results of job futures
+    :param future: Done job future
+    """
+    if not future.cancelled() and future.exception() is not None:
+        logger.error('Job thread failed', exc_info=future.exception())
+
+
+def start_job(url_path: str, query_params: Dict,
+              task: Callable[[JobProgress], Dict]) -> IndexingJob:
+    """
+    Save the job and run it in the background
+    :param url_path: Requested path
+    :param query_params: Query parameters of the request
+    :param task: Gets statistics reporting progress to the given callback
+    :return: Pending job
+    """
+    job = IndexingJob.objects.create(url_path=url_path,
+                                     query_params=query_params)
+    JOB_EXECUTOR.submit(run_job, job, task).add_done_callback(log_job_error)
+    return job
@@ -0,0 +1,83 @@
+import json
+import os
+import platform
+import tempfile
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from file_and_folder_indexer.apps.file_reader.benchmarks import (
+    compare_results, generate_corpora, run_benchmarks)
+
+
+class Command(BaseCommand):
+    help = ('Time indexing of generated text corpora and save results to '
+            'JSON file. Indexes are kept in a test database, so the index '
+            'of the project is not changed')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default='benchmark.json',
+            help='JSON file to save results to')
+        parser.add_argument(
+            '--compare',
+            help='JSON file with results of a previous run to compare with')
+        parser.add_argument(
+            '--scale', type=float, default=1.0,
+            help='Multiplier of corpora sizes')
+        parser.add_argument(
+            '--repeat', type=int, default=3,
+            help='Number of timed runs of every benchmark')
+        parser.add_argument(
+            '--workers', type=int,
+            help='Max number of worker processes to read files with')
+
+    def handle(self, *args, **options):
+        previous_results = None
+        if options['compare']:
+            if not os.path.isfile(options['compare']):
+                raise CommandError(f"{options['compare']} is not a file.")
+            with open(options['compare'], encoding='utf-8') as file:
+                previous_results = json.load(file)['results']
+
+        setup_test_environment()
+        database_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True)
+        try:
+            with tempfile.TemporaryDirectory() as root:
+                self.stdout.write('Generating corpora...')
+                folders = generate_corpora(root, options['scale'])
+                self.stdout.write('Running benchmarks...')
+                results = run_benchmarks(folders, options['repeat'],
+                                         options['workers'])
+        finally:
+            connection.creation.destroy_test_db(database_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'scale': options['scale'],
+            'repeat': options['repeat'],
+            'results': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=4)
+
+        for result in results:
+            self.stdout.write(
+                f"{result['corpus']:<18} {result['benchmark']:<22} "
+                f"{result['state']:<5} {result['seconds']:>9.4f} s "
+                f"{result['mb_per_s'] or 0:>9.2f} MB/s "
+                f"{result['files_per_s'] or 0:>10.1f} files/s")
+        if previous_results is not None:
+            self.stdout.write('Speedup against the previous run:')
+            for name, old, new, speedup in compare_results(previous_results,
+                                                           results):
+                self.stdout.write(f'{name:<50} {old:>9.4f} s -> '
+                                  f'{new:>9.4f} s {speedup:>6.2f}x')
+        self.stdout.write(f"Results are saved to {options['output']}.")
@@ -0,0 +1,40 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from file_and_folder_indexer.apps.file_reader.apps import FileReaderConfig
+from file_and_folder_indexer.apps.file_reader.watcher import watch
+
+
+class Command(BaseCommand):
+    help = ('Index text files of the folders and keep their statistics up '
+            'to date while files change')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'folders', nargs='*',
+            help='Folders to watch, FileReaderConfig.watched_folders by '
+                 'default. Give them the same way they are requested')
+        parser.add_argument(
+            '--polling', action='store_true',
+            help='Poll folders even if inotify is available')
+        parser.add_argument(
+            '--interval', type=float,
+            help='Seconds between polls or to gather changes for')
+        parser.add_argument(
+            '--workers', type=int,
+            help='Max number of worker processes to read files with')
+
+    def handle(self, *args, **options):
+        folders = options['folders'] or FileReaderConfig.watched_folders
+        if not folders:
+            raise CommandError('No folders to watch.')
+        for folder in folders:
+            if not os.path.isdir(folder):
+                raise CommandError(f'{folder} is not a folder.')
+        try:
+            watch([os.path.normpath(folder) for folder in folders],
+                  polling=options['polling'], interval=options['interval'],
+                  workers=options['workers'])
+        except KeyboardInterrupt:
+            self.stdout.write('Watching stopped.')
@@ -0,0 +1,185 @@
+import codecs
+import io
+import mmap
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import BinaryIO, Callable, FrozenSet, Iterator, List, Optional
+
+from file_and_folder_indexer.apps.file_reader.decoding import (BlockDecoder,
+                                                               detect_encoding)
+from file_and_folder_indexer.apps.file_reader.planner import FULL_PLAN, Plan
+from file_and_folder_indexer.apps.file_reader.tokenizer import (
+    add_word_counts, split_words, tokenize)
+
+UTF8_ENCODINGS = ['utf-8', 'utf-8-sig']
+
+
+@dataclass(frozen=True)
+class ByteClasses:
+    """Byte level description of words in text of a single encoding"""
+    # Matches runs of bytes words are made of
+    runs: re.Pattern
+    # Matches a byte words are not made of
+    boundary: re.Pattern
+    # Matches a byte that is not valid in the encoding, if it can be checked
+    # byte by byte
+    invalid: Optional[re.Pattern]
+    # Splits a run of bytes into words
+    split_run: Callable[[bytes], List[str]]
+
+
+def get_byte_set_pattern(byte_values: FrozenSet[int], negate: bool = False
+                         ) -> re.Pattern:
+    """
+    Get pattern matching a byte of the set
+    :param byte_values: Bytes to match
+    :param negate: Whether to match bytes out of the set instead
+    :return: Compiled pattern
+    """
+    byte_set = b''.join(re.escape(bytes([value])) for value in byte_values)
+    return re.compile(b'[' + (b'^' if negate else b'') + byte_set + b']')
+
+
+def split_utf8_run(run: bytes) -> List[str]:
+    """
+    Split run of ascii letters and non ascii bytes into words
+    :param run: Bytes of UTF-8 text
+    :return: Words of the run
+    """
+    if run.isascii():
+        return [run.decode('ascii')]
+    return split_words(run.decode('utf-8'))
+
+
+@lru_cache(maxsize=None)
+def get_byte_classes(encoding: str) -> Optional[ByteClasses]:
+    """
+    Get byte classes of UTF-8 or single-byte encodings. In single-byte
+    encodings runs of Letter bytes are words already. In UTF-8 all non ascii
+    bytes go into runs together with ascii letters, only runs with non ascii
+    bytes are decoded to be split into words
+    :param encoding: Encoding name
+    :return: Byte classes or None if words can not be found byte by byte
+    """
+    try:
+        encoding = codecs.lookup(encoding).name
+    except LookupError:
+        return None
+    if encoding in UTF8_ENCODINGS:
+        run_bytes = frozenset(b'abcdefghijklmnopqrstuvwxyz'
+                              b'ABCDEFGHIJKLMNOPQRSTUVWXYZ') | frozenset(
+            range(0x80, 0x100))
+        return ByteClasses(
+            runs=re.compile(get_byte_set_pattern(run_bytes).pattern + b'+'),
+            boundary=get_byte_set_pattern(run_bytes, negate=True),
+            invalid=None, split_run=split_utf8_run)
+
+    chars = {}
+    decoder = codecs.getincrementaldecoder(encoding)()
+    for value in range(0x100):
+        decoder.reset()
+        try:
+            chars[value] = decoder.decode(bytes([value]), final=False)
+        except UnicodeDecodeError:
+            # Byte is not valid in the single-byte encoding
+            continue
+        if len(chars[value]) != 1:
+            # Byte is kept by the decoder to form a character together with
+            # the next bytes, so encoding is multibyte
+            return None
+    decoded = bytes(chars).decode(encoding, errors='ignore')
+    if decoded != ''.join(chars.values()):
+        # Bytes form characters together, so encoding is not single-byte
+        return None
+
+    run_bytes = frozenset(value for value, char in chars.items()
+                          if char.isalpha())
+    invalid_bytes = frozenset(range(0x100)) - frozenset(chars)
+    return ByteClasses(
+        runs=re.compile(get_byte_set_pattern(run_bytes).pattern + b'+'),
+        boundary=get_byte_set_pattern(run_bytes, negate=True),
+        invalid=get_byte_set_pattern(invalid_bytes) if invalid_bytes else None,
+        split_run=lambda run: [run.decode(encoding)])
+
+
+def is_mappable(file: BinaryIO, min_size: int) -> bool:
+    """
+    Check if file is a big enough regular file on disk to be mapped
+    :param file: File opened in binary mode
+    :param min_size: Min size of file in bytes
+    :return: Whether file can be read as MappedText
+    """
+    if not isinstance(file, io.BufferedReader):
+        return False
+    return os.fstat(file.fileno()).st_size >= min_size
+
+
+class MappedText:
+    """
+    Text of the file mapped into memory. Words are counted as runs of bytes
+    found by byte patterns, only unique runs are decoded to strings, so text
+    is not decoded as a whole. Iterating gives decoded text blocks
+    """
+
+    def __init__(self, file: BinaryIO, encodings: List[str],
+                 block_size: int) -> None:
+        self.file = file
+        self.encodings = encodings
+        self.block_size = block_size
+        self.encoding = detect_encoding(file.read(block_size), encodings)
+        file.seek(0)
+        if self.encoding is None:
+            raise ValueError(f'None of {self.encodings} encodings fits.')
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(BlockDecoder(self.file, [self.encoding], self.block_size))
+
+    def iter_runs(self, data: mmap.mmap,
+                  byte_classes: ByteClasses) -> Iterator[List[bytes]]:
+        """
+        Find runs of word bytes block by block, blocks end on boundary bytes
+        so runs are never cut
+        :param data: Mapped file
+        :param byte_classes: Byte classes of the file encoding
+        :return: Lists of runs of every block
+        """
+        pos, size = 0, len(data)
+        while pos < size:
+            boundary = byte_classes.boundary.search(data,
+                                                    pos + self.block_size)
+            endpos = boundary.start() if boundary else size
+            if byte_classes.invalid and byte_classes.invalid.search(
+                    data, pos, endpos):
+                raise ValueError(f'File is not in {self.encoding} encoding.')
+            yield byte_classes.runs.findall(data, pos, endpos)
+            pos = endpos
+
+    def tokenize(self, statistics, plan: Plan = FULL_PLAN) -> None:
+        """
+        Gather words, vowels and consonants statistics from mapped file
+        :param statistics: Statistics to add gathered information to
+        :param plan: Statistics to gather, all by default
+        """
+        byte_classes = get_byte_classes(self.encoding)
+        if byte_classes is None:
+            tokenize(iter(self), statistics, plan)
+            return
+
+        runs_counter = Counter()
+        with mmap.mmap(self.file.fileno(), 0,
+                       access=mmap.ACCESS_READ) as data:
+            for runs in self.iter_runs(data, byte_classes):
+                runs_counter.update(runs)
+
+        words_counter = Counter()
+        try:
+            for run, count in runs_counter.items():
+                for word in byte_classes.split_run(run):
+                    words_counter[word] += count
+        except UnicodeDecodeError as err:
+            raise ValueError(f'File is not in {self.encoding} encoding:\n'
+                             f'{err}') from err
+        add_word_counts(words_counter, statistics, plan)
@@ -0,0 +1,213 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence
+
+from file_and_folder_indexer.apps.file_reader.cache import get_cache_info
+
+# Prefix of names of all metrics
+PREFIX = 'file_indexer'
+# Content type of Prometheus text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Upper bounds of request duration histogram buckets in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                    10.0, 30.0, 60.0, 300.0)
+# Help of counters of statistics gathering events by event name, events are
+# counted by tracing hooks of the indexer
+EVENTS = {
+    'files_parsed': 'Files read and split into words.',
+    'bytes_read': 'Bytes of read files.',
+    'read_seconds': 'Seconds spent reading and splitting files into words, '
+                    'bytes read divided by it is tokenizer throughput.',
+    'encoding_fallbacks': 'Encodings tried after the first one failed to '
+                          'decode a file.',
+    'files_from_index': 'File statistics taken from the index without '
+                        'reading files.',
+    'folders_from_index': 'Folder statistics taken from the index without '
+                          'merging files statistics.',
+}
+# Help of cache metrics by cache info key, metric type and name suffix
+CACHE_METRICS = {
+    'hits': ('Lookups finding cached value.', 'counter', '_total'),
+    'misses': ('Lookups not finding cached value.', 'counter', '_total'),
+    'evictions': ('Values evicted to fit cache limits.', 'counter',
+                  '_total'),
+    'entries': ('Number of cached values.', 'gauge', ''),
+    'bytes': ('Approximate size of cached values.', 'gauge', ''),
+}
+# Types of requested path, words in files are looked up in the file index,
+# paths not found or not valid are unknown
+TARGETS = ('word', 'file', 'folder', 'unknown')
+
+
+class Histogram:
+    """Number of observed values not greater than upper bounds of buckets,
+    their sum and count"""
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Add value to the first bucket with upper bound not less than it"""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def get_samples(self, name: str, labels: str) -> List[str]:
+        """
+        Get cumulative bucket counts, sum and count of the histogram
+        :param name: Metric name
+        :param labels: Labels of samples without braces
+        :return: Sample lines
+        """
+        samples = []
+        total = 0
+        bounds = [format_value(bound) for bound in self.buckets] + ['+Inf']
+        for bound, bucket_count in zip(bounds, self.counts):
+            total += bucket_count
+            samples.append(f'{name}_bucket{{{labels},le="{bound}"}} {total}')
+        samples.append(f'{name}_sum{{{labels}}} {format_value(self.sum)}')
+        samples.append(f'{name}_count{{{labels}}} {total}')
+        return samples
+
+
+class IndexerMetrics:
+    """Counters and histograms of statistics gathering in the process since
+    it started"""
+
+    def __init__(self, buckets: Sequence[float] = DURATION_BUCKETS) -> None:
+        self.lock = threading.Lock()
+        self.events: Counter = Counter()
+        self.durations = {target: Histogram(buckets) for target in TARGETS}
+        self.errors: Counter = Counter()
+        self.in_progress: Counter = Counter()
+
+    def count(self, name: str, value: float) -> None:
+        """Add value to the counter of the event, unknown events are
+        ignored"""
+        if name in EVENTS:
+            with self.lock:
+                self.events[name] += value
+
+    def add_file(self, size: int, seconds: float,
+                 encodings_tried: int) -> None:
+        """Count the read file, its bytes, read time and encoding
+        fallbacks"""
+        with self.lock:
+            self.events['files_parsed'] += 1
+            self.events['bytes_read'] += size
+            self.events['read_seconds'] += seconds
+            if encodings_tried > 1:
+                self.events['encoding_fallbacks'] += encodings_tried - 1
+
+    def count_error(self, target: str) -> None:
+        """Count the request of the target answered with error response"""
+        with self.lock:
+            self.errors[target] += 1
+
+    @contextmanager
+    def observe_request(self, target: str) -> Iterator[None]:
+        """Count the request in progress while the block runs and add its
+        wall time to the duration histogram of the target, the request
+        failed if the block raises"""
+        with self.lock:
+            self.in_progress[target] += 1
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            with self.lock:
+                self.errors[target] += 1
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            with self.lock:
+                self.in_progress[target] -= 1
+                self.durations[target].observe(seconds)
+
+    def render(self) -> str:
+        """Get metrics and cache counters in Prometheus text format"""
+        lines = []
+        with self.lock:
+            name = f'{PREFIX}_request_duration_seconds'
+            add_metric_header(lines, name, 'histogram',
+                              'Wall time of statistics responses by '
+                              'requested path type.')
+            for target in TARGETS:
+                lines.extend(self.durations[target].get_samples(
+                    name, f'target="{target}"'))
+            add_metric(lines, f'{PREFIX}_request_errors_total', 'counter',
+                       'Statistics requests failed or answered with error '
+                       'responses by requested path type.',
+                       {f'target="{target}"': self.errors[target]
+                        for target in TARGETS})
+            add_metric(lines, f'{PREFIX}_requests_in_progress', 'gauge',
+                       'Statistics requests being handled by requested path '
+                       'type.',
+                       {f'target="{target}"': self.in_progress[target]
+                        for target in TARGETS})
+            for event, help_text in EVENTS.items():
+                add_metric(lines, f'{PREFIX}_{event}_total', 'counter',
+                           help_text, {'': self.events[event]})
+
+        caches = get_cache_info()
+        for key, (help_text, metric_type, suffix) in CACHE_METRICS.items():
+            add_metric(lines, f'{PREFIX}_cache_{key}{suffix}', metric_type,
+                       help_text, {f'cache="{cache}"': info[key]
+                                   for cache, info in caches.items()})
+        ratios = {}
+        for cache, info in caches.items():
+            lookups = info['hits'] + info['misses']
+            ratios[f'cache="{cache}"'] = (info['hits'] / lookups
+                                          if lookups else 0)
+        add_metric(lines, f'{PREFIX}_cache_hit_ratio', 'gauge',
+                   'Share of lookups finding cached value.', ratios)
+        return '\n'.join(lines) + '\n'
+
+
+def format_value(value: float) -> str:
+    """
+    Format sample value, integers are written without fractional part
+    :param value: Sample value
+    :return: Formatted value
+    """
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def add_metric_header(lines: List[str], name: str, metric_type: str,
+                      help_text: str) -> None:
+    """
+    Add HELP and TYPE lines of the metric
+    :param lines: Lines to add to
+    :param name: Metric name
+    :param metric_type: counter, gauge or histogram
+    :param help_text: Metric description
+    """
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} {metric_type}')
+
+
+def add_metric(lines: List[str], name: str, metric_type: str,
+               help_text: str, samples: Dict[str, float]) -> None:
+    """
+    Add metric with its samples
+    :param lines: Lines to add to
+    :param name: Metric name
+    :param metric_type: counter or gauge
+    :param help_text: Metric description
+    :param samples: Sample values by labels without braces, empty labels
+    for the metric without labels
+    """
+    add_metric_header(lines, name, metric_type, help_text)
+    for labels, value in samples.items():
+        labels = f'{{{labels}}}' if labels else ''
+        lines.append(f'{name}{labels} {format_value(value)}')
+
+
+# Metrics of the process, every server process has its own
+METRICS = IndexerMetrics()
@@ -0,0 +1,37 @@
+# Generated by Django 4.0.1 on 2026-10-18 08:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True,
+                                           primary_key=True,
+                                           serialize=False,
+                                           verbose_name='ID')),
+                ('path', models.TextField(unique=True)),
+                ('size', models.BigIntegerField()),
+                ('mtime_ns', models.BigIntegerField()),
+                ('inode', models.BigIntegerField()),
+                ('encoding', models.CharField(blank=True, max_length=32)),
+                ('total_words_number', models.BigIntegerField(default=0)),
+                ('total_words_length', models.BigIntegerField(default=0)),
+                ('vowel_number', models.BigIntegerField(default=0)),
+                ('consonant_number', models.BigIntegerField(default=0)),
+                ('unique_words', models.JSONField(default=dict)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'file indexes',
+            },
+        ),
+    ]
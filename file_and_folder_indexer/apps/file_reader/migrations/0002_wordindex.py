@@ -0,0 +1,42 @@
+# Generated by Django 4.0.1 on 2026-10-18 08:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('file_reader', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileindex',
+            name='words_indexed',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='WordIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True,
+                                           primary_key=True,
+                                           serialize=False,
+                                           verbose_name='ID')),
+                ('word', models.TextField(db_index=True)),
+                ('count', models.BigIntegerField()),
+                ('file', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='words',
+                    to='file_reader.fileindex')),
+            ],
+            options={
+                'verbose_name_plural': 'word indexes',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='wordindex',
+            constraint=models.UniqueConstraint(fields=('file', 'word'),
+                                               name='unique_file_word'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.0.1 on 2026-10-18 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('file_reader', '0002_wordindex'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileindex',
+            name='has_letters',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='fileindex',
+            name='has_totals',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='fileindex',
+            name='has_words',
+            field=models.BooleanField(default=True),
+        ),
+    ]
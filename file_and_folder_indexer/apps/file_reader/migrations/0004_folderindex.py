@@ -0,0 +1,37 @@
+# Generated by Django 4.0.1 on 2026-10-18 08:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('file_reader', '0003_fileindex_plan'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FolderIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True,
+                                           primary_key=True,
+                                           serialize=False,
+                                           verbose_name='ID')),
+                ('path', models.TextField(unique=True)),
+                ('total_words_number', models.BigIntegerField(default=0)),
+                ('total_words_length', models.BigIntegerField(default=0)),
+                ('vowel_number', models.BigIntegerField(default=0)),
+                ('consonant_number', models.BigIntegerField(default=0)),
+                ('unique_words', models.JSONField(default=dict)),
+                ('has_words', models.BooleanField(default=True)),
+                ('has_totals', models.BooleanField(default=True)),
+                ('has_letters', models.BooleanField(default=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('digest', models.CharField(max_length=64)),
+                ('number_of_files', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'folder indexes',
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.0.1 on 2026-10-18 08:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('file_reader', '0004_folderindex'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexingJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True,
+                                           primary_key=True,
+                                           serialize=False,
+                                           verbose_name='ID')),
+                ('url_path', models.TextField()),
+                ('query_params', models.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pending'),
+                                                     ('running', 'Running'),
+                                                     ('done', 'Done'),
+                                                     ('failed', 'Failed')],
+                                            default='pending',
+                                            max_length=16)),
+                ('files_done', models.BigIntegerField(default=0)),
+                ('files_total', models.BigIntegerField(default=0)),
+                ('bytes_done', models.BigIntegerField(default=0)),
+                ('bytes_total', models.BigIntegerField(default=0)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
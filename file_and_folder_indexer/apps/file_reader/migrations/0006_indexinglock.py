@@ -0,0 +1,24 @@
+# Generated by Django 4.0.1 on 2026-10-18 09:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('file_reader', '0005_indexingjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexingLock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True,
+                                           primary_key=True,
+                                           serialize=False,
+                                           verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('created', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,118 @@
+from django.db import models
+
+from file_and_folder_indexer.apps.file_reader.planner import Plan
+
+
+class StatisticsIndex(models.Model):
+    """Statistics stored for a file system entry"""
+    path = models.TextField(unique=True)
+    total_words_number = models.BigIntegerField(default=0)
+    total_words_length = models.BigIntegerField(default=0)
+    vowel_number = models.BigIntegerField(default=0)
+    consonant_number = models.BigIntegerField(default=0)
+    unique_words = models.JSONField(default=dict)
+    # Statistics gathered for the entry, see planner.Plan
+    has_words = models.BooleanField(default=True)
+    has_totals = models.BooleanField(default=True)
+    has_letters = models.BooleanField(default=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+    def __str__(self) -> str:
+        return self.path
+
+    @property
+    def plan(self) -> Plan:
+        """Plan the stored statistics were gathered by"""
+        return Plan(listing=False, files=False, words=self.has_words,
+                    totals=self.has_totals, letters=self.has_letters)
+
+
+class FileIndex(StatisticsIndex):
+    """Statistics of the text file valid while the file signature (size,
+    modification time and inode) stays the same"""
+    size = models.BigIntegerField()
+    mtime_ns = models.BigIntegerField()
+    inode = models.BigIntegerField()
+    encoding = models.CharField(max_length=32, blank=True)
+    # Whether WordIndex rows of the file are built
+    words_indexed = models.BooleanField(default=False)
+
+    class Meta:
+        verbose_name_plural = 'file indexes'
+
+    @property
+    def signature(self) -> tuple:
+        return self.size, self.mtime_ns, self.inode
+
+
+class FolderIndex(StatisticsIndex):
+    """Statistics of all text files under the folder valid while the folder
+    digest stays the same. Digest covers signatures of the folder files and
+    digests of its subfolders, so a changed file changes digests of all its
+    folders up to the root"""
+    digest = models.CharField(max_length=64)
+    number_of_files = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'folder indexes'
+
+
+class WordIndex(models.Model):
+    """Number of times the word meets in the indexed file"""
+    file = models.ForeignKey(FileIndex, on_delete=models.CASCADE,
+                             related_name='words')
+    word = models.TextField(db_index=True)
+    count = models.BigIntegerField()
+
+    class Meta:
+        verbose_name_plural = 'word indexes'
+        constraints = [
+            models.UniqueConstraint(fields=['file', 'word'],
+                                    name='unique_file_word'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.word}: {self.count}'
+
+
+class IndexingJob(models.Model):
+    """Statistics request handled in the background"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    url_path = models.TextField()
+    query_params = models.JSONField(default=dict)
+    status = models.CharField(max_length=16, choices=STATUSES,
+                              default=PENDING)
+    files_done = models.BigIntegerField(default=0)
+    files_total = models.BigIntegerField(default=0)
+    bytes_done = models.BigIntegerField(default=0)
+    bytes_total = models.BigIntegerField(default=0)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f'{self.url_path}: {self.status}'
+
+
+class IndexingLock(models.Model):
+    """Statistics request being handled by one of the server processes"""
+    # Hash of the requested path, its version and statistics
+    key = models.CharField(max_length=64, unique=True)
+    created = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return self.key
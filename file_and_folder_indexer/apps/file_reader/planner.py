@@ -0,0 +1,89 @@
+from dataclasses import dataclass
+from typing import List
+
+
+@dataclass(frozen=True)
+class Plan:
+    """Stages of statistics gathering needed to get requested statistics"""
+    # Walk the folder and keep paths of all its files and folders
+    listing: bool = True
+    # Walk the folder and count its files
+    files: bool = True
+    # Read changed files and count every word. Gives totals and letters
+    # counts as well, which are derived from the word frequency table
+    words: bool = True
+    # Read changed files and count words and their length
+    totals: bool = True
+    # Read changed files and count vowels and consonants
+    letters: bool = True
+
+    @property
+    def parse(self) -> bool:
+        """Whether files have to be read"""
+        return self.words or self.totals or self.letters
+
+    def covers(self, other: 'Plan') -> bool:
+        """Whether statistics gathered by this plan are enough for other"""
+        return all(getattr(self, stage) or not getattr(other, stage)
+                   for stage in FILE_STAGES)
+
+    def union(self, other: 'Plan') -> 'Plan':
+        """Plan gathering statistics of both plans"""
+        return Plan(**{stage: getattr(self, stage) or getattr(other, stage)
+                       for stage in self.__dataclass_fields__})
+
+
+# Stages gathering statistics of a single file
+FILE_STAGES = ['words', 'totals', 'letters']
+# Stages needed for every statistics field, from the cheapest to the most
+# expensive ones:
+# 'files_and_folders' - one stat call per folder entry, memory for all paths
+# 'number_of_files' - one stat call per folder entry
+# 'vowel_number', 'consonant_number' - changed files are read and their
+# letters are classified, text is not split into words
+# 'total_words_number', 'total_words_length', 'average_word_length' -
+# changed files are read and split into words, words are not counted
+# 'unique_words', 'most_recent', 'least_recent', 'times_in_text',
+# 'times_in_files' - changed files are read and every word is counted,
+# memory for the whole vocabulary
+FIELD_STAGES = {
+    'files_and_folders': ['listing'],
+    'number_of_files': ['files'],
+    'unique_words': ['words'],
+    'most_recent': ['words'],
+    'least_recent': ['words'],
+    'total_words_number': ['totals'],
+    'total_words_length': ['totals'],
+    'average_word_length': ['totals'],
+    'times_in_text': ['words'],
+    'times_in_files': ['words'],
+    'vowel_number': ['letters'],
+    'consonant_number': ['letters'],
+}
+FULL_PLAN = Plan()
+
+
+def get_requested_fields(statistics) -> List[str]:
+    """
+    Get statistics fields set to True as requested ones
+    :param statistics: Requested information
+    :return: Names of requested fields
+    """
+    return [field for field, value in statistics.__dict__.items()
+            if value is True]
+
+
+def plan_statistics(fields: List[str]) -> Plan:
+    """
+    Get the cheapest plan giving all requested statistics fields
+    :param fields: Names of requested fields, all fields if empty
+    :return: Plan of statistics gathering
+    """
+    if not fields:
+        return FULL_PLAN
+    stages = {stage for field in fields
+              for stage in FIELD_STAGES.get(field, [])}
+    if 'words' in stages:
+        stages.update(FILE_STAGES)
+    return Plan(**{stage: stage in stages
+                   for stage in Plan.__dataclass_fields__})
@@ -0,0 +1,206 @@
+import bz2
+import gzip
+import logging
+import lzma
+import os
+import zipfile
+from functools import lru_cache, partial
+from importlib.metadata import entry_points
+from typing import (BinaryIO, Callable, Dict, Iterable, Iterator, List,
+                    Optional, Union)
+
+from django.utils.module_loading import import_string
+
+from file_and_folder_indexer.apps.file_reader.apps import FileReaderConfig
+from file_and_folder_indexer.apps.file_reader.decoding import BlockDecoder
+from file_and_folder_indexer.apps.file_reader.docx_reader import \
+    iter_docx_blocks
+from file_and_folder_indexer.apps.file_reader.mapped_text import (MappedText,
+                                                                  is_mappable)
+
+# Gets file opened in binary mode and encodings to try in order of priority,
+# returns text blocks of the file. If text blocks have 'encoding' attribute,
+# file is read again with next encodings when text is not valid in it
+Reader = Callable[[BinaryIO, List[str]], Iterable[str]]
+# Entry points group of readers installed by other packages, entry point
+# names are file extensions
+READERS_ENTRY_POINT_GROUP = 'file_and_folder_indexer.readers'
+# Errors of broken compressed files and archives
+ARCHIVE_ERRORS = (OSError, EOFError, lzma.LZMAError, zipfile.BadZipFile)
+logger = logging.getLogger(__name__)
+
+
+def read_text(file: BinaryIO, encodings: List[str]
+              ) -> Union[BlockDecoder, MappedText]:
+    """
+    Read next block of characters from file. Big files on disk are mapped
+    into memory and words are counted without decoding the whole text
+    :param file: File opened in binary mode
+    :param encodings: Encodings to try in order of priority
+    """
+    if is_mappable(file, FileReaderConfig.mmap_min_size):
+        return MappedText(file, encodings, FileReaderConfig.read_block_size)
+    return BlockDecoder(file, encodings, FileReaderConfig.read_block_size)
+
+
+def read_docx(file: BinaryIO, encodings: List[str]) -> Iterator[str]:
+    """
+    Read next paragraph text from file, document.xml is streamed out of the
+    package and parsed element by element
+    :param file: .docx file opened in binary mode
+    :param encodings: Not used, text encoding is set by the document
+    """
+    return iter_docx_blocks(file)
+
+
+class CompressedBlockDecoder(BlockDecoder):
+    """
+    Iterable of text blocks of the compressed file, decompressed on the fly
+    while being read
+    """
+
+    def __init__(self, file: BinaryIO, encodings: List[str], block_size: int,
+                 decompress: Callable[[BinaryIO], BinaryIO]) -> None:
+        super().__init__(decompress(file), encodings, block_size)
+
+    def __iter__(self) -> Iterator[str]:
+        try:
+            yield from super().__iter__()
+        except ARCHIVE_ERRORS as err:
+            # Broken file is not read again with other encodings
+            self.encoding = None
+            raise ValueError(f'Compressed file is broken: {err}') from err
+
+
+def read_compressed(decompress: Callable[[BinaryIO], BinaryIO],
+                    file: BinaryIO, encodings: List[str]
+                    ) -> CompressedBlockDecoder:
+    """
+    Read next block of characters from compressed text file
+    :param decompress: Opens decompressed stream of the file
+    :param file: Compressed file opened in binary mode
+    :param encodings: Encodings to try in order of priority
+    """
+    return CompressedBlockDecoder(file, encodings,
+                                  FileReaderConfig.read_block_size,
+                                  decompress)
+
+
+class ZipMembersReader:
+    """
+    Iterable of text blocks of zip archive members with readable extensions.
+    Members are read one by one straight from the archive without being
+    extracted, encrypted members are skipped. Encoding is detected for every
+    member on its own, members not valid in any encoding are skipped
+    """
+
+    def __init__(self, file: BinaryIO, encodings: List[str]) -> None:
+        self.file = file
+        self.encodings = encodings
+
+    def __iter__(self) -> Iterator[str]:
+        try:
+            with zipfile.ZipFile(self.file) as archive:
+                for info in archive.infolist():
+                    reader = get_reader(os.path.splitext(info.filename)[1])
+                    if info.is_dir() or info.flag_bits & 0x1 or not reader:
+                        continue
+                    encodings = self.get_member_encodings(archive, info,
+                                                          reader)
+                    if encodings is None:
+                        continue
+                    with archive.open(info) as member:
+                        yield from reader(member, encodings)
+                    # Words do not run from one member into the next one
+                    yield '\n'
+        except ARCHIVE_ERRORS as err:
+            raise ValueError(f'Archive is broken: {err}') from err
+
+    def get_member_encodings(self, archive: zipfile.ZipFile,
+                             info: zipfile.ZipInfo, reader: Reader
+                             ) -> Optional[List[str]]:
+        """
+        Find encoding the member text is valid in. Text blocks with
+        'encoding' attribute are decoded without being counted first, so
+        text valid in the encoding only at the beginning is not counted
+        before the member is read again with the next encodings
+        :param archive: Opened zip archive
+        :param info: Member of the archive
+        :param reader: Reader of the member extension
+        :return: Encodings to read the member with or None if the member is
+        not valid in any encoding
+        """
+        encodings = self.encodings
+        while encodings:
+            with archive.open(info) as member:
+                blocks = reader(member, encodings)
+                if not hasattr(blocks, 'encoding'):
+                    return encodings
+                try:
+                    for _ in blocks:
+                        pass
+                except ValueError as err:
+                    encoding = blocks.encoding
+                    logger.warning(f'Reading {info.filename} member with '
+                                   f'{encoding} encoding failed:\n{err}')
+                    if encoding not in encodings:
+                        break
+                    encodings = encodings[encodings.index(encoding) + 1:]
+                    continue
+            return [blocks.encoding] if blocks.encoding else encodings
+        logger.warning(f'Member {info.filename} is skipped, none of '
+                       f'{self.encodings} encodings fits.')
+        return None
+
+
+BUILTIN_READERS: Dict[str, Reader] = {
+    '.txt': read_text,
+    '.md': read_text,
+    '.csv': read_text,
+    '.log': read_text,
+    '.docx': read_docx,
+    '.gz': partial(read_compressed, gzip.open),
+    '.bz2': partial(read_compressed, bz2.open),
+    '.xz': partial(read_compressed, lzma.open),
+    '.zip': ZipMembersReader,
+}
+
+
+def load_entry_point_readers() -> Dict[str, Reader]:
+    """
+    Load readers registered by installed packages in
+    READERS_ENTRY_POINT_GROUP entry points group
+    :return: Readers by file extensions
+    """
+    group = entry_points()
+    if hasattr(group, 'select'):
+        group = group.select(group=READERS_ENTRY_POINT_GROUP)
+    else:
+        group = group.get(READERS_ENTRY_POINT_GROUP, [])
+    return {entry_point.name: entry_point.load() for entry_point in group}
+
+
+@lru_cache(maxsize=None)
+def get_readers() -> Dict[str, Reader]:
+    """
+    Get all registered readers: built-in ones, ones from entry points and
+    ones from FileReaderConfig.readers, the later override the former
+    :return: Readers by file extensions
+    """
+    readers = dict(BUILTIN_READERS)
+    readers.update(load_entry_point_readers())
+    readers.update({extension: import_string(reader)
+                    for extension, reader in FileReaderConfig.readers.items()})
+    return readers
+
+
+def get_reader(extension: str) -> Optional[Reader]:
+    """
+    Get reader of files with the extension
+    :param extension: File extension with the leading dot
+    :return: Reader or None if files with the extension are not read
+    """
+    allowed_extensions = FileReaderConfig.allowed_file_extensions
+    if allowed_extensions is not None and extension not in allowed_extensions:
+        return None
+    return get_readers().get(extension)
@@ -0,0 +1,305 @@
+import logging
+import os
+from datetime import timedelta
+from typing import Dict, Iterable, List, Tuple, Type
+
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from file_and_folder_indexer.apps.file_reader.models import (FileIndex,
+                                                             FolderIndex,
+                                                             IndexingLock,
+                                                             StatisticsIndex,
+                                                             WordIndex)
+from file_and_folder_indexer.apps.file_reader.planner import FULL_PLAN, Plan
+from file_and_folder_indexer.apps.file_reader.vocabulary import WordCounts
+
+# Max number of files looked up in the index with a single query, keeps
+# the number of query parameters under the SQLite limit
+LOAD_CHUNK_SIZE = 500
+# Number of loaded indexes fetched from the database at once, their word
+# frequency tables are made compact one by one
+LOAD_FETCH_SIZE = 50
+logger = logging.getLogger(__name__)
+
+
+def load_indexes(model: Type[StatisticsIndex], paths: List[str],
+                 words: bool = True) -> Dict[str, StatisticsIndex]:
+    """
+    Get stored statistics of files or folders with a query per
+    LOAD_CHUNK_SIZE paths
+    :param model: FileIndex or FolderIndex
+    :param paths: Files or folders paths
+    :param words: Whether to load word frequency tables right away
+    :return: Indexes by path of files or folders indexed before
+    """
+    indexes = {}
+    for start in range(0, len(paths), LOAD_CHUNK_SIZE):
+        chunk = paths[start:start + LOAD_CHUNK_SIZE]
+        queryset = model.objects.filter(path__in=chunk)
+        if not words:
+            queryset = queryset.defer('unique_words')
+        try:
+            for index in queryset.iterator(chunk_size=LOAD_FETCH_SIZE):
+                # Word frequency tables are kept compact in memory, JSON
+                # objects are dropped right after loading
+                if words:
+                    index.unique_words = WordCounts.from_mapping(
+                        index.unique_words)
+                indexes[index.path] = index
+        except DatabaseError as err:
+            logger.warning(f'Loading indexes of {len(chunk)} paths '
+                           f'failed:\n{err}')
+    return indexes
+
+
+def load_file_indexes(paths: List[str],
+                      words: bool = True) -> Dict[str, FileIndex]:
+    """
+    Get stored statistics of files
+    :param paths: Files paths
+    :param words: Whether to load word frequency tables right away
+    :return: File indexes by path of files indexed before
+    """
+    return load_indexes(FileIndex, paths, words)
+
+
+def load_folder_indexes(paths: List[str]) -> Dict[str, FolderIndex]:
+    """
+    Get stored statistics of folders, word frequency tables are loaded on
+    access
+    :param paths: Folders paths
+    :return: Folder indexes by path of folders indexed before
+    """
+    return load_indexes(FolderIndex, paths, words=False)
+
+
+def save_folder_indexes(folders: List[Tuple[str, str, object]],
+                        plan: Plan = FULL_PLAN) -> None:
+    """
+    Store statistics of folders in a single transaction
+    :param folders: Paths, digests and statistics of folders
+    :param plan: Plan the statistics were gathered by
+    """
+    if not folders:
+        return
+    try:
+        with transaction.atomic():
+            for path, digest, statistics in folders:
+                FolderIndex.objects.update_or_create(path=path, defaults={
+                    'digest': digest,
+                    'number_of_files': statistics.number_of_files,
+                    'total_words_number': statistics.total_words_number,
+                    'total_words_length': statistics.total_words_length,
+                    'vowel_number': statistics.vowel_number,
+                    'consonant_number': statistics.consonant_number,
+                    'unique_words': dict(statistics.unique_words.items()),
+                    'has_words': plan.words,
+                    'has_totals': plan.totals,
+                    'has_letters': plan.letters,
+                })
+    except DatabaseError as err:
+        logger.warning(f'Saving indexes of {len(folders)} folders '
+                       f'failed:\n{err}')
+
+
+def delete_folder_indexes(path: str) -> None:
+    """
+    Drop stored statistics of the deleted folder and its subfolders
+    :param path: Folder path
+    """
+    try:
+        FolderIndex.objects.filter(
+            Q(path=path) | Q(path__startswith=os.path.join(path, ''))
+        ).delete()
+    except DatabaseError as err:
+        logger.warning(f'Deleting indexes of {path} failed:\n{err}')
+
+
+def load_indexed_paths(root_path: str) -> List[str]:
+    """
+    Get paths of indexed files under the folder
+    :param root_path: Folder path
+    :return: Files paths
+    """
+    prefix = os.path.join(root_path, '')
+    try:
+        return list(FileIndex.objects.filter(
+            path__startswith=prefix).values_list('path', flat=True))
+    except DatabaseError as err:
+        logger.warning(f'Loading indexes of {root_path} failed:\n{err}')
+        return []
+
+
+def delete_file_indexes(paths: Iterable[str]) -> None:
+    """
+    Drop stored statistics of files deleted from the file system
+    :param paths: Files paths
+    """
+    paths = list(paths)
+    try:
+        for start in range(0, len(paths), LOAD_CHUNK_SIZE):
+            FileIndex.objects.filter(
+                path__in=paths[start:start + LOAD_CHUNK_SIZE]).delete()
+    except DatabaseError as err:
+        logger.warning(f'Deleting indexes of {len(paths)} files '
+                       f'failed:\n{err}')
+
+
+def save_file_index(path: str, signature: Tuple[int, int, int],
+                    encoding: str, statistics,
+                    plan: Plan = FULL_PLAN) -> FileIndex:
+    """
+    Store statistics of the file. Word index of the file is dropped until
+    it is requested again
+    :param path: File path
+    :param signature: File size, modification time and inode number
+    :param encoding: Encoding the file was read with
+    :param statistics: Statistics of the file
+    :param plan: Plan the statistics were gathered by
+    :return: Saved file index or not saved one if database is not available
+    """
+    size, mtime_ns, inode = signature
+    values = {
+        'size': size,
+        'mtime_ns': mtime_ns,
+        'inode': inode,
+        'encoding': encoding,
+        'total_words_number': statistics.total_words_number,
+        'total_words_length': statistics.total_words_length,
+        'vowel_number': statistics.vowel_number,
+        'consonant_number': statistics.consonant_number,
+        'unique_words': dict(statistics.unique_words.items()),
+        'has_words': plan.words,
+        'has_totals': plan.totals,
+        'has_letters': plan.letters,
+        'words_indexed': False,
+    }
+    try:
+        with transaction.atomic():
+            file_index, created = FileIndex.objects.update_or_create(
+                path=path, defaults=values)
+            if not created:
+                WordIndex.objects.filter(file=file_index).delete()
+    except DatabaseError as err:
+        logger.warning(f'Saving index of {path} failed:\n{err}')
+        file_index = FileIndex(path=path, **values)
+    # Stored JSON object is not kept in memory
+    file_index.unique_words = WordCounts.from_mapping(statistics.unique_words)
+    return file_index
+
+
+def build_word_index(file_index: FileIndex) -> None:
+    """
+    Store number of times every word meets in the file, so single words
+    can be looked up without loading the whole word frequency table
+    :param file_index: Saved file index
+    """
+    with transaction.atomic():
+        WordIndex.objects.bulk_create(
+            WordIndex(file=file_index, word=word, count=count)
+            for word, count in file_index.unique_words.items()
+        )
+        file_index.words_indexed = True
+        file_index.save(update_fields=['words_indexed'])
+
+
+def load_word_count(file_index: FileIndex, word: str) -> int:
+    """
+    Get number of times the word meets in the file, build the word index of
+    the file if it is not built yet
+    :param file_index: File index
+    :param word: Word to look up
+    :return: Number of times the word meets in the file
+    """
+    if file_index.pk is None:
+        return file_index.unique_words.get(word, 0)
+    try:
+        if not file_index.words_indexed:
+            build_word_index(file_index)
+        count = WordIndex.objects.filter(
+            file=file_index, word=word).values_list('count', flat=True)
+        return count.first() or 0
+    except DatabaseError as err:
+        logger.warning(f'Loading word index of {file_index.path} '
+                       f'failed:\n{err}')
+        return file_index.unique_words.get(word, 0)
+
+
+def load_word_counts(root_path: str, file_indexes: Iterable[FileIndex],
+                     word: str) -> Dict[str, int]:
+    """
+    Get number of times the word meets in every file under the folder,
+    build word indexes of files if they are not built yet
+    :param root_path: Folder path
+    :param file_indexes: Indexes of files under the folder
+    :param word: Word to look up
+    :return: Number of times the word meets in the file by file path for
+    files containing the word
+    """
+    file_indexes = {file_index.path: file_index
+                    for file_index in file_indexes}
+    try:
+        for file_index in file_indexes.values():
+            if file_index.pk is not None and not file_index.words_indexed:
+                build_word_index(file_index)
+        counts = WordIndex.objects.filter(
+            word=word, file__path__startswith=root_path,
+        ).values_list('file__path', 'count')
+        # Index can keep files deleted since the last indexing
+        counts = {path: count for path, count in counts
+                  if path in file_indexes}
+    except DatabaseError as err:
+        logger.warning(f'Loading word index of {root_path} failed:\n{err}')
+        counts = {}
+    for path, file_index in file_indexes.items():
+        if file_index.pk is None and word in file_index.unique_words:
+            counts[path] = file_index.unique_words[word]
+    return counts
+
+
+def acquire_lock(key: str, timeout: float) -> bool:
+    """
+    Take the lock of the key unless another process holds it. Lock held for
+    longer than timeout is taken over, its process is considered dead
+    :param key: Lock key
+    :param timeout: Seconds the lock can be held for
+    :return: Whether the lock is taken, True if locks are not available
+    """
+    now = timezone.now()
+    try:
+        IndexingLock.objects.filter(
+            key=key, created__lt=now - timedelta(seconds=timeout)).delete()
+        with transaction.atomic():
+            IndexingLock.objects.create(key=key, created=now)
+        return True
+    except IntegrityError:
+        return False
+    except DatabaseError as err:
+        logger.warning(f'Taking lock {key} failed:\n{err}')
+        return True
+
+
+def is_locked(key: str) -> bool:
+    """
+    Check if the lock of the key is held
+    :param key: Lock key
+    :return: Whether the lock is held, False if locks are not available
+    """
+    try:
+        return IndexingLock.objects.filter(key=key).exists()
+    except DatabaseError as err:
+        logger.warning(f'Checking lock {key} failed:\n{err}')
+        return False
+
+
+def release_lock(key: str) -> None:
+    """
+    Release the lock of the key
+    :param key: Lock key
+    """
+    try:
+        IndexingLock.objects.filter(key=key).delete()
+    except DatabaseError as err:
+        logger.warning(f'Releasing lock {key} failed:\n{err}')
@@ -1,12 +1,55 @@
+import gzip
+import io
 import json
+import multiprocessing
 import os
+import pickle
+import re
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import zipfile
+from unittest import mock, skipUnless
 
-from django.test import Client, TestCase
+import docx
+from django.db import OperationalError
+from django.test import AsyncClient, Client, TestCase, TransactionTestCase
 
+from file_and_folder_indexer.apps.file_reader import views
+from file_and_folder_indexer.apps.file_reader.apps import FileReaderConfig
+from file_and_folder_indexer.apps.file_reader.benchmarks import (
+    compare_results, generate_corpora, run_benchmarks)
+from file_and_folder_indexer.apps.file_reader.cache import (
+    FILE_STATISTICS_CACHE, RESULTS_CACHE, LRUCache, get_size)
+from file_and_folder_indexer.apps.file_reader.coalescing import (SingleFlight,
+                                                                 coalesce)
 from file_and_folder_indexer.apps.file_reader.conversion import convert_to_url
+from file_and_folder_indexer.apps.file_reader.docx_reader import \
+    iter_docx_blocks
 from file_and_folder_indexer.apps.file_reader.indexer import (
-    Statistics, get_file_statistics, get_folder_statistics, get_objects_list,
-    get_word_statistics)
+    FileManager, Statistics, get_file_statistics, get_folder_statistics,
+    get_objects_list, get_word_statistics, merge_statistics,
+    read_file_statistics)
+from file_and_folder_indexer.apps.file_reader.jobs import JOB_EXECUTOR, run_job
+from file_and_folder_indexer.apps.file_reader.models import (FileIndex,
+                                                             FolderIndex,
+                                                             IndexingJob,
+                                                             WordIndex)
+from file_and_folder_indexer.apps.file_reader.readers import get_readers
+from file_and_folder_indexer.apps.file_reader.storage import (acquire_lock,
+                                                              is_locked,
+                                                              release_lock)
+from file_and_folder_indexer.apps.file_reader.tokenizer import count_letters
+from file_and_folder_indexer.apps.file_reader.views import PROFILE_LOCK
+from file_and_folder_indexer.apps.file_reader.vocabulary import (VOCABULARY,
+                                                                 WordCounts)
+from file_and_folder_indexer.apps.file_reader.walker import (scan_folder, walk,
+                                                             walk_after,
+                                                             walk_tree)
+from file_and_folder_indexer.apps.file_reader.watcher import (InotifyWatcher,
+                                                              refresh)
 
 test_dir = 'test_dir'
 test_file = os.path.join(test_dir, 'test.txt')
@@ -19,6 +62,8 @@ class IndexerTestCase(TestCase):
         if not os.path.exists(test_dir):
             os.mkdir(test_dir)
             os.mkdir(empty_dir)
+        FILE_STATISTICS_CACHE.clear()
+        RESULTS_CACHE.clear()
 
     def tearDown(self) -> None:
         """Remove test directories and files."""
@@ -49,6 +94,68 @@ class IndexerTestCase(TestCase):
 
         self.assertEqual(lst, files_and_folders)
 
+    def test_walk_after(self):
+        """Testing that listing continued after any listed path goes on like
+        the whole listing and does not scan folders listed before."""
+        with tempfile.TemporaryDirectory() as root:
+            for folder in ['a/b/c', 'a/d', 'e']:
+                os.makedirs(os.path.join(root, folder))
+            for file in ['1.txt', 'a/2.txt', 'a/b/3.txt', 'a/b/c/4.txt',
+                         'e/5.txt']:
+                open(os.path.join(root, file), 'w').close()
+            listing = [entry.path for entry in walk(root)]
+            for position, last_path in enumerate(listing):
+                self.assertEqual(
+                    [entry.path for entry in walk_after(root, last_path)],
+                    listing[position + 1:])
+            with mock.patch(
+                    'file_and_folder_indexer.apps.file_reader.walker.'
+                    'scan_folder', wraps=scan_folder) as scan_folder_mock:
+                list(walk_after(root, listing[-1]))
+            # Only folders on the way to the last path and after it are
+            # scanned, the whole walk scans all 6 folders
+            self.assertLess(scan_folder_mock.call_count, 6)
+            with self.assertRaises(ValueError):
+                list(walk_after(root, os.path.join(root, 'absent')))
+            # Whichever of the folders is walked first, the symlink in it
+            # leads to the other one, which is not walked twice
+            os.symlink(os.path.join(root, 'e'), os.path.join(root, 'a/link'))
+            os.symlink(os.path.join(root, 'a'), os.path.join(root, 'e/link'))
+            listing = [entry.path
+                       for entry in walk(root, follow_symlinks=True)]
+            for position, last_path in enumerate(listing):
+                self.assertEqual(
+                    [entry.path for entry in walk_after(
+                        root, last_path, follow_symlinks=True)],
+                    listing[position + 1:])
+
+    def test_walk_symlinks(self):
+        """Testing that symlinks are listed like os.walk lists them, folders
+        reached through symlinks are walked only if they are followed and
+        only once, and symlinks are skipped if asked."""
+        self.set_up_file('test')
+        link = os.path.join(empty_dir, 'link')
+        file_link = os.path.join(empty_dir, 'file_link.txt')
+        os.symlink(os.path.abspath(test_dir), link)
+        os.symlink(os.path.abspath(test_file), file_link)
+        try:
+            listed = list(walk(test_dir))
+            followed = [entry.path
+                        for entry in walk(test_dir, follow_symlinks=True)]
+            skipped = [entry.path
+                       for entry in walk(test_dir, skip_symlinks=True)]
+        finally:
+            os.remove(link)
+            os.remove(file_link)
+        self.assertEqual(sorted(entry.path for entry in listed),
+                         sorted([test_dir, empty_dir, test_file, link,
+                                 file_link]))
+        self.assertTrue(all(entry.is_file for entry in listed
+                            if entry.path == file_link))
+        self.assertEqual(sorted(followed),
+                         sorted(entry.path for entry in listed))
+        self.assertEqual(skipped, [test_dir, empty_dir, test_file])
+
     def test_get_word_statistics_(self):
         """Testing that statistics about word in the text file is returned."""
         text = 'test'
@@ -81,6 +188,274 @@ class IndexerTestCase(TestCase):
             statistics.consonant_number == consonant_number
         ]))
 
+    def test_get_file_statistics_late_encoding_error(self):
+        """Testing that statistics are gathered only once if the file turns
+        out to be in another encoding after the first read block."""
+        text = 'test ' * 10 + 'теста'
+        with open(file=test_file, mode='w', encoding='Windows-1251') as f:
+            f.write(text)
+        read_block_size = FileReaderConfig.read_block_size
+        FileReaderConfig.read_block_size = 8
+        try:
+            statistics = get_file_statistics(test_file, Statistics())
+        finally:
+            FileReaderConfig.read_block_size = read_block_size
+        self.assertEqual(statistics.unique_words, {'test': 10, 'теста': 1})
+        file_index = FileIndex.objects.get(path=test_file)
+        self.assertEqual(file_index.encoding, 'Windows-1251')
+
+    def test_get_mapped_file_statistics(self):
+        """Testing that statistics of memory mapped file are equal to
+        statistics of decoded text, also if the file turns out to be in
+        another encoding after the first read block."""
+        text = 'test ' * 10 + 'теста, №1 тест_TEST'
+        with open(file=test_file, mode='w', encoding='Windows-1251') as f:
+            f.write(text)
+        with mock.patch.multiple(FileReaderConfig, read_block_size=8,
+                                 mmap_min_size=0):
+            statistics = get_file_statistics(test_file, Statistics())
+        unique_words = {'test': 10, 'теста': 1, 'тест': 1, 'TEST': 1}
+        self.assertEqual(statistics.unique_words, unique_words)
+        self.assertEqual(statistics.total_words_length, 53)
+        self.assertEqual(statistics.vowel_number, 14)
+        file_index = FileIndex.objects.get(path=test_file)
+        self.assertEqual(file_index.encoding, 'Windows-1251')
+
+    def test_get_mapped_multibyte_file_statistics(self):
+        """Testing that statistics of big file in multibyte encoding are
+        equal whether the file is memory mapped or not."""
+        with open(file=test_file, mode='w', encoding='cp932') as f:
+            f.write('テスト 日本語の テキスト test\n' * 1000)
+        results = []
+        for mmap_min_size in [0, 2 ** 40]:
+            with mock.patch.multiple(FileReaderConfig, read_block_size=1024,
+                                     mmap_min_size=mmap_min_size):
+                statistics, encoding = read_file_statistics(
+                    test_file, ['utf-8', 'cp932'])
+            results.append((statistics, encoding))
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0][1], 'cp932')
+        self.assertEqual(results[0][0].total_words_number, 4000)
+
+    def test_get_file_statistics_from_index(self):
+        """Testing that statistics of unchanged file are taken from the index
+        and changed file is read again."""
+        self.set_up_file('test text')
+        get_file_statistics(test_file, Statistics())
+        FileIndex.objects.filter(path=test_file).update(
+            unique_words={'indexed': 2})
+        # Index is changed behind the memory cache
+        FILE_STATISTICS_CACHE.clear()
+        statistics = get_file_statistics(test_file, Statistics())
+        self.assertEqual(statistics.unique_words, {'indexed': 2})
+
+        self.set_up_file('other test text')
+        statistics = get_file_statistics(test_file, Statistics())
+        unique_words = {'other': 1, 'test': 1, 'text': 1}
+        self.assertEqual(statistics.unique_words, unique_words)
+
+    def test_get_file_statistics_planned_fields(self):
+        """Testing that only statistics needed for requested fields are
+        gathered and missing ones are gathered when they are requested."""
+        self.set_up_file('test text test')
+        statistics = get_file_statistics(
+            test_file, Statistics(total_words_number=True))
+        self.assertEqual(statistics.total_words_number, 3)
+        self.assertEqual(statistics.unique_words, {})
+        file_index = FileIndex.objects.get(path=test_file)
+        self.assertEqual(file_index.unique_words, {})
+        self.assertFalse(file_index.has_words)
+
+        statistics = get_file_statistics(
+            test_file, Statistics(most_recent=True))
+        self.assertEqual(statistics.most_recent, ['test', 'text'])
+        self.assertTrue(FileIndex.objects.get(path=test_file).has_words)
+
+    def test_lru_cache(self):
+        """Testing that least recently used values are evicted when cache
+        limits are exceeded."""
+        cache = LRUCache(max_entries=2,
+                         max_bytes=get_size('a' * 100) * 2 - 1)
+        cache.put('a', 'a')
+        cache.put('b', 'b')
+        self.assertEqual(cache.get('a'), 'a')
+        cache.put('c', 'c')
+        self.assertIsNone(cache.get('b'))
+        cache.put('d', 'd' * 100)
+        cache.put('e', 'e' * 100)
+        self.assertEqual(list(cache.entries), ['e'])
+        cache.put('f', 'f' * 1000)
+        self.assertIsNone(cache.get('f'))
+        info = {'hits': 1, 'misses': 2, 'evictions': 4, 'entries': 1,
+                'bytes': get_size('e' * 100)}
+        self.assertEqual(cache.info(), info)
+
+    def test_get_file_statistics_from_cache(self):
+        """Testing that statistics of unchanged file are taken from the
+        memory cache without database queries."""
+        self.set_up_file('test text')
+        get_file_statistics(test_file, Statistics())
+        with self.assertNumQueries(0):
+            statistics = get_file_statistics(test_file, Statistics())
+        self.assertEqual(statistics.unique_words, {'test': 1, 'text': 1})
+
+        self.set_up_file('other test text')
+        statistics = get_file_statistics(test_file, Statistics())
+        self.assertEqual(statistics.total_words_number, 3)
+
+    def test_run_benchmarks(self):
+        """Testing that benchmarks of generated corpora report throughput
+        comparable between runs."""
+        with tempfile.TemporaryDirectory() as root:
+            folders = generate_corpora(root, scale=0.001)
+            folders = {name: folders[name] for name in ('cjk', 'docx')}
+            results = run_benchmarks(folders, repeat=1, workers=1)
+        self.assertEqual(len(results), 2 * 9)
+        for result in results:
+            self.assertGreater(result['bytes'], 0)
+            self.assertGreater(result['files_per_s'], 0)
+        comparison = compare_results(results, results)
+        self.assertEqual({speedup for _, _, _, speedup in comparison}, {1.0})
+
+    def test_refresh_folder(self):
+        """Testing that watcher refresh indexes changed files and drops
+        indexes of deleted ones."""
+        self.set_up_file('test text')
+        refresh(test_dir)
+        file_index = FileIndex.objects.get(path=test_file)
+        self.assertEqual(file_index.unique_words, {'test': 1, 'text': 1})
+
+        os.remove(test_file)
+        refresh(test_dir)
+        self.assertFalse(FileIndex.objects.filter(path=test_file).exists())
+
+    @skipUnless(sys.platform.startswith('linux'), 'inotify is Linux only')
+    def test_inotify_watcher(self):
+        """Testing that files written, also while they are kept open, and
+        created in new folders of watched folder are reported."""
+        watcher = InotifyWatcher([test_dir], interval=0.1)
+        try:
+            self.set_up_file('test')
+            self.assertIn(test_file, watcher.wait())
+            new_dir = os.path.join(empty_dir, 'New Folder')
+            os.mkdir(new_dir)
+            self.assertIn(new_dir, watcher.wait())
+            new_file = os.path.join(new_dir, 'new.txt')
+            with open(new_file, 'w') as f:
+                f.write('new')
+            self.assertIn(new_file, watcher.wait())
+            with open(new_file, 'a') as f:
+                f.write(' appended')
+                f.flush()
+                # File kept open is reported once written
+                self.assertIn(new_file, watcher.wait())
+        finally:
+            watcher.close()
+            new_file = os.path.join(empty_dir, 'New Folder', 'new.txt')
+            if os.path.exists(new_file):
+                os.remove(new_file)
+                os.rmdir(os.path.dirname(new_file))
+
+    def test_single_flight(self):
+        """Testing that concurrent calls with the same key wait for a single
+        call and share its result."""
+        single_flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def func():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {'total_words_number': 1}
+
+        results = []
+        leader = threading.Thread(
+            target=lambda: results.append(single_flight.run('key', func)))
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(
+            target=lambda: results.append(single_flight.run('key', func)))
+            for _ in range(3)]
+        for follower in followers:
+            follower.start()
+        # Followers have to find the leader call in flight
+        time.sleep(0.2)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'total_words_number': 1}] * 4)
+
+    def test_coalesce_versions(self):
+        """Testing that concurrent calls with the same key and another
+        version of the path do not share the call in flight."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def func():
+            started.set()
+            release.wait(5)
+            return 'old'
+
+        results = []
+        with mock.patch('file_and_folder_indexer.apps.file_reader.'
+                        'coalescing.run_once_across_processes',
+                        lambda key, func: func()):
+            leader = threading.Thread(target=lambda: results.append(
+                coalesce('key', func, 'v1')))
+            leader.start()
+            started.wait(5)
+            results.append(coalesce('key', lambda: 'new', 'v2'))
+            release.set()
+            leader.join(5)
+        self.assertEqual(results, ['new', 'old'])
+
+    def test_indexing_lock_only_for_scans(self):
+        """Testing that only folder scans reading files take the lock of the
+        request in the database."""
+        self.set_up_file('text')
+        client = Client()
+        with mock.patch('file_and_folder_indexer.apps.file_reader.'
+                        'coalescing.acquire_lock',
+                        return_value=True) as acquire_lock_mock:
+            client.get(convert_to_url('/api/filesystem/' + test_file + '/'))
+            client.get(convert_to_url('/api/filesystem/' + test_dir + '/'),
+                       {'get': 'number_of_files'})
+            self.assertFalse(acquire_lock_mock.called)
+            client.get(convert_to_url('/api/filesystem/' + test_dir + '/'))
+            self.assertEqual(acquire_lock_mock.call_count, 1)
+
+    def test_indexing_lock(self):
+        """Testing that lock of a request is held by one process at once and
+        abandoned lock is taken over."""
+        self.assertTrue(acquire_lock('key', timeout=60))
+        self.assertFalse(acquire_lock('key', timeout=60))
+        self.assertTrue(acquire_lock('key', timeout=0))
+        release_lock('key')
+        self.assertFalse(is_locked('key'))
+
+    def test_count_letters(self):
+        """Testing that vowels and consonants are counted only among Letter
+        characters transliterated to ascii."""
+        self.assertEqual(count_letters('Tест, 中文 - ß42'), (1, 4))
+
+    def test_get_word_statistics_from_word_index(self):
+        """Testing that word statistics of unchanged file are taken from the
+        word index without reading the file."""
+        self.set_up_file('test text test')
+        word_path = os.path.join(test_file, 'test')
+        get_word_statistics(word_path, Statistics())
+        with mock.patch(
+                'file_and_folder_indexer.apps.file_reader.indexer.'
+                'read_file_statistics',
+                side_effect=AssertionError('File is read again.')):
+            statistics = get_word_statistics(word_path, Statistics())
+        self.assertEqual(statistics.times_in_text, 2)
+        self.assertTrue(WordIndex.objects.filter(file__path=test_file,
+                                                 word='text').exists())
+
     def test_get_file_statistics(self):
         """Testing that statistics about the text file is returned."""
         text = ('test test test test test words words words words in in in '
@@ -101,6 +476,123 @@ class IndexerTestCase(TestCase):
             statistics.consonant_number == consonant_number
         ]))
 
+    def test_get_file_statistics_words_across_blocks(self):
+        """Testing that words cut across read blocks are counted once."""
+        text = 'Файл для теста с текстом для теста.'
+        self.set_up_file(text)
+        read_block_size = FileReaderConfig.read_block_size
+        FileReaderConfig.read_block_size = 3
+        try:
+            statistics = get_file_statistics(test_file, Statistics())
+        finally:
+            FileReaderConfig.read_block_size = read_block_size
+        unique_words = {'Файл': 1, 'для': 2, 'теста': 2, 'с': 1, 'текстом': 1}
+        self.assertEqual(statistics.unique_words, unique_words)
+        self.assertEqual(statistics.total_words_number, 7)
+        self.assertEqual(statistics.total_words_length, 28)
+
+    def test_get_docx_file_statistics(self):
+        """Testing that streamed '.docx' text equals python-docx text."""
+        docx_file = os.path.join(test_dir, 'test.docx')
+        document = docx.Document()
+        document.add_paragraph('Файл для ').add_run('теста').add_break()
+        document.add_paragraph('с текстом').add_run().add_tab()
+        document.add_table(rows=1, cols=1).cell(0, 0).text = 'таблица'
+        document.add_paragraph('для теста.')
+        document.save(docx_file)
+        try:
+            with FileManager(docx_file) as file_manager:
+                text = ''.join(file_manager.read())
+            statistics = get_file_statistics(docx_file, Statistics())
+        finally:
+            os.remove(docx_file)
+        expected_text = ''.join(paragraph.text
+                                for paragraph in document.paragraphs)
+        self.assertEqual(text, expected_text)
+        unique_words = {'Файл': 1, 'для': 2, 'теста': 2, 'с': 1, 'текстом': 1}
+        self.assertEqual(statistics.unique_words, unique_words)
+
+    def test_read_docx_long_paragraph(self):
+        """Testing that runs of a '.docx' paragraph are dropped once read, so
+        a paragraph of many runs is read in about constant memory."""
+        runs = 20000
+        body = ''.join(f'<w:r><w:t>word{i} </w:t></w:r>' for i in range(runs))
+        namespace = ('http://schemas.openxmlformats.org/wordprocessingml/'
+                     '2006/main')
+        document = io.BytesIO()
+        with zipfile.ZipFile(document, 'w') as package:
+            package.writestr('word/document.xml', (
+                f'<w:document xmlns:w="{namespace}"><w:body><w:p>{body}'
+                f'</w:p></w:body></w:document>'))
+        document.seek(0)
+        tracemalloc.start()
+        try:
+            blocks = sum(1 for _ in iter_docx_blocks(document))
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(blocks, runs)
+        self.assertLess(peak, 1024 * 1024)
+
+    def test_get_compressed_files_statistics(self):
+        """Testing that compressed files and readable zip members are read
+        and broken compressed files are skipped."""
+        gz_file = os.path.join(test_dir, 'test.log.gz')
+        zip_file = os.path.join(test_dir, 'test.zip')
+        broken_file = os.path.join(test_dir, 'broken.xz')
+        with gzip.open(gz_file, 'wt', encoding='utf-8') as f:
+            f.write('test log')
+        with zipfile.ZipFile(zip_file, 'w') as archive:
+            archive.writestr('notes.md', 'test')
+            archive.writestr('folder/table.csv', 'text,text')
+            archive.writestr('image.png', b'\x89PNG')
+        with open(broken_file, 'wb') as f:
+            f.write(b'not compressed')
+        try:
+            statistics = get_folder_statistics(test_dir, Statistics())
+        finally:
+            for path in (gz_file, zip_file, broken_file):
+                os.remove(path)
+        self.assertEqual(statistics.number_of_files, 3)
+        unique_words = {'test': 2, 'log': 1, 'text': 2}
+        self.assertEqual(statistics.unique_words, unique_words)
+
+    def test_get_zip_members_encodings(self):
+        """Testing that encoding is detected for every zip member on its own
+        and members not valid in any encoding are skipped."""
+        zip_file = os.path.join(test_dir, 'test.zip')
+        with zipfile.ZipFile(zip_file, 'w') as archive:
+            archive.writestr('first.txt', 'текст text'.encode('utf-8'))
+            # Beginning of the member is valid in utf-8, the end is not
+            archive.writestr('second.txt', ('text ' * 4096 + 'файл')
+                             .encode('cp1251'))
+            archive.writestr('broken.txt', b'test \x98\x81\x82\xff')
+        try:
+            with mock.patch.multiple(FileReaderConfig, read_block_size=1024,
+                                     encodings_queue=['utf-8',
+                                                      'Windows-1251']):
+                statistics = get_file_statistics(zip_file, Statistics())
+        finally:
+            os.remove(zip_file)
+        self.assertEqual(statistics.unique_words,
+                         {'текст': 1, 'text': 4097, 'файл': 1})
+
+    def test_readers_from_settings(self):
+        """Testing that readers registered in settings are used."""
+        rst_file = os.path.join(test_dir, 'test.rst')
+        with open(rst_file, 'w', encoding='utf-8') as f:
+            f.write('test text')
+        readers = {'.rst': 'file_and_folder_indexer.apps.file_reader.readers.'
+                           'read_text'}
+        try:
+            with mock.patch.object(FileReaderConfig, 'readers', readers):
+                get_readers.cache_clear()
+                statistics = get_file_statistics(rst_file, Statistics())
+        finally:
+            get_readers.cache_clear()
+            os.remove(rst_file)
+        self.assertEqual(statistics.unique_words, {'test': 1, 'text': 1})
+
     def test_get_folder_statistics(self):
         """Testing that statistics about the folder is returned."""
         text = 'test text'
@@ -124,6 +616,127 @@ class IndexerTestCase(TestCase):
             statistics.consonant_number == consonant_number
         ]))
 
+    def test_get_folder_statistics_from_rollups(self):
+        """Testing that statistics of unchanged folders are taken from their
+        rollups and folders with changed files are merged again."""
+        self.set_up_file('test text')
+        sub_file = os.path.join(empty_dir, 'sub.txt')
+        with open(sub_file, 'w', encoding='utf-8') as f:
+            f.write('sub text')
+        try:
+            get_folder_statistics(test_dir, Statistics())
+            self.assertEqual(
+                FolderIndex.objects.get(path=empty_dir).unique_words,
+                {'sub': 1, 'text': 1})
+            # Folder indexes and words of the root one are loaded only
+            with self.assertNumQueries(2):
+                statistics = get_folder_statistics(
+                    test_dir, Statistics(unique_words=True))
+            self.assertEqual(statistics.unique_words,
+                             {'test': 1, 'text': 2, 'sub': 1})
+
+            with open(sub_file, 'w', encoding='utf-8') as f:
+                f.write('other sub')
+            statistics = get_folder_statistics(
+                test_dir, Statistics(unique_words=True))
+            self.assertEqual(statistics.unique_words,
+                             {'test': 1, 'text': 1, 'other': 1, 'sub': 1})
+            statistics = get_folder_statistics(
+                empty_dir, Statistics(total_words_number=True))
+            self.assertEqual(statistics.total_words_number, 2)
+        finally:
+            os.remove(sub_file)
+
+    def test_merge_statistics(self):
+        """Testing that words, vowels and consonants counts of statistics are
+        summed."""
+        first = Statistics(unique_words={'test': 2, 'text': 1},
+                           total_words_number=3, vowel_number=3)
+        second = Statistics(unique_words={'text': 1, 'file': 1},
+                            total_words_number=2, vowel_number=3)
+        statistics = merge_statistics([first, second])
+        self.assertEqual(list(statistics.unique_words.items()),
+                         [('test', 2), ('text', 2), ('file', 1)])
+        self.assertEqual(statistics.total_words_number, 5)
+        self.assertEqual(statistics.vowel_number, 6)
+
+    def test_word_counts(self):
+        """Testing that word counts keep order of appearance through merges
+        and pickling."""
+        first = WordCounts({'test': 2, 'text': 1})
+        second = WordCounts({'text': 1, 'file': 1})
+        merged = WordCounts.merge([first, {'new': 1}, second])
+        self.assertEqual(list(merged.items()), [('test', 2), ('text', 2),
+                                                ('new', 1), ('file', 1)])
+        self.assertEqual(pickle.loads(pickle.dumps(merged)), merged)
+        self.assertEqual(merged['text'], 2)
+        self.assertNotIn('absent', merged)
+        self.assertEqual(merged.get_most_common(2), ['test', 'text'])
+        self.assertEqual(merged.get_least_common(2), ['file', 'new'])
+        self.assertEqual(first, {'test': 2, 'text': 1})
+
+    def test_vocabulary_release(self):
+        """Testing that words are removed from the vocabulary once no table
+        holds them and cached tables are measured with their words."""
+        words = {f'vocabulary_{i}': 1 for i in range(100)}
+        size = len(VOCABULARY)
+        first = WordCounts(words)
+        second = WordCounts.merge([first, {'vocabulary_new': 1}])
+        self.assertEqual(len(VOCABULARY), size + 101)
+        self.assertGreater(get_size(first), get_size(words) // 2)
+        del first
+        self.assertEqual(len(VOCABULARY), size + 101)
+        del second
+        self.assertEqual(len(VOCABULARY), size)
+        self.assertNotIn('vocabulary_0', VOCABULARY.ids)
+        self.assertEqual(WordCounts({'vocabulary_0': 3})['vocabulary_0'], 3)
+
+    @skipUnless(hasattr(os, 'fork'), 'fork is not available')
+    def test_vocabulary_fork(self):
+        """Testing that process forked while another thread holds the lock of
+        the vocabulary can add words to it."""
+        locked = threading.Event()
+
+        def hold_lock():
+            with VOCABULARY.lock:
+                locked.set()
+                time.sleep(0.2)
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        locked.wait(5)
+        process = multiprocessing.get_context('fork').Process(
+            target=WordCounts, args=({'forked': 1},))
+        process.start()
+        process.join(10)
+        holder.join(5)
+        if process.is_alive():
+            process.kill()
+        self.assertEqual(process.exitcode, 0)
+
+    def test_get_folder_statistics_parallel(self):
+        """Testing that folder statistics gathered by worker processes are the
+        same as gathered in one process."""
+        texts = ['test text', 'text of the second file', 'третий файл text']
+        paths = [os.path.join(test_dir, f'test_{i}.txt')
+                 for i in range(len(texts))]
+        for path, text in zip(paths, texts):
+            with open(file=path, mode='w', encoding='utf-8') as f:
+                f.write(text)
+        batch_size = FileReaderConfig.batch_size
+        FileReaderConfig.batch_size = 1
+        try:
+            parallel = get_folder_statistics(test_dir, Statistics(),
+                                             workers=2)
+            FileIndex.objects.all().delete()
+            serial = get_folder_statistics(test_dir, Statistics(), workers=1)
+        finally:
+            FileReaderConfig.batch_size = batch_size
+            for path in paths:
+                os.remove(path)
+        self.assertEqual(parallel, serial)
+        self.assertEqual(serial.unique_words['text'], 3)
+
 
 class ApiRequestTestCase(TestCase):
     def setUp(self) -> None:
@@ -131,6 +744,8 @@ class ApiRequestTestCase(TestCase):
         if not os.path.exists(test_dir):
             os.mkdir(test_dir)
             os.mkdir(empty_dir)
+        FILE_STATISTICS_CACHE.clear()
+        RESULTS_CACHE.clear()
 
     def tearDown(self) -> None:
         """Remove test directories and files."""
@@ -198,6 +813,109 @@ class ApiRequestTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertJSONEqual(response.content, info)
 
+    def test_get_filesystem_file_statistics_one_query_param(self):
+        """Testing that requested file statistics field is not added to the
+        request flag."""
+        self.set_up_file('text')
+        client = Client()
+        url = convert_to_url('/api/filesystem/' + test_file + '/')
+        response = client.get(url, {'get': 'vowel_number'})
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(response.content, {'vowel_number': 1})
+
+    def test_get_filesystem_not_modified(self):
+        """Testing that statistics are not sent again while nothing under
+        the path changes."""
+        self.set_up_file('text')
+        client = Client()
+        url = convert_to_url('/api/filesystem/' + test_dir + '/')
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        with mock.patch(
+                'file_and_folder_indexer.apps.file_reader.views.indexate',
+                side_effect=AssertionError('Statistics are gathered again.')):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = client.get(url, {'get': 'vowel_number'},
+                              HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        self.set_up_file('other text')
+        with mock.patch(
+                'file_and_folder_indexer.apps.file_reader.indexer.walk_tree',
+                wraps=walk_tree) as walk_tree_mock:
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(walk_tree_mock.call_count, 1)
+
+    def test_get_filesystem_debug_timings(self):
+        """Testing that debug request returns stages timings and counters
+        of read files."""
+        self.set_up_file('text')
+        client = Client()
+        url = convert_to_url('/api/filesystem/' + test_dir + '/')
+        response = client.get(url, {'debug': 'timings'})
+        self.assertEqual(response.status_code, 400)
+        debug_requests = mock.patch.object(FileReaderConfig, 'debug_requests',
+                                           True)
+        debug_requests.start()
+        self.addCleanup(debug_requests.stop)
+        response = client.get(url, {'debug': 'timings,profile'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('indexate;dur=', response['Server-Timing'])
+        info = response.json()
+        self.assertEqual(info['number_of_files'], 1)
+        self.assertIn('read', info['debug']['stages_ms'])
+        self.assertEqual(info['debug']['counters']['files_parsed'], 1)
+        self.assertEqual(info['debug']['slowest_files'][0]['path'],
+                         test_file)
+        self.assertTrue(info['debug']['profile'])
+
+        response = client.get(url, {'debug': 'memory'})
+        self.assertEqual(response.status_code, 400)
+        with PROFILE_LOCK:
+            response = client.get(url, {'debug': 'profile'})
+        self.assertEqual(response.status_code, 409)
+
+    def test_get_metrics(self):
+        """Testing that metrics count statistics requests and read files."""
+        self.set_up_file('text')
+        client = Client()
+        response = client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        files_parsed = re.search(r'^file_indexer_files_parsed_total (\d+)$',
+                                 response.content.decode(), re.M)
+        file_requests = re.search(
+            r'^file_indexer_request_duration_seconds_count\{target="file"\} '
+            r'(\d+)$', response.content.decode(), re.M)
+        client.get(convert_to_url('/api/filesystem/' + test_file + '/'))
+        # Responses taken from the cache and errors are timed as well
+        client.get(convert_to_url('/api/filesystem/' + test_file + '/'))
+        client.get(convert_to_url('/api/filesystem/' + test_dir + '/absent/'))
+
+        response = client.get(
+            '/metrics', HTTP_ACCEPT='application/openmetrics-text;'
+                                    'version=1.0.0,text/plain;version=0.0.4;'
+                                    'q=0.5,*/*;q=0.1')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        metrics = response.content.decode()
+        self.assertIn(f'file_indexer_files_parsed_total '
+                      f'{int(files_parsed.group(1)) + 1}\n', metrics)
+        self.assertIn(f'file_indexer_request_duration_seconds_count'
+                      f'{{target="file"}} {int(file_requests.group(1)) + 2}\n',
+                      metrics)
+        self.assertRegex(metrics, r'file_indexer_request_errors_total'
+                                  r'\{target="unknown"\} [1-9]')
+        self.assertIn('file_indexer_requests_in_progress{target="folder"} 0',
+                      metrics)
+        self.assertIn('file_indexer_cache_hit_ratio{cache="results"}',
+                      metrics)
+
     def test_get_filesystem_folder_statistics(self):
         """Testing that valid folder statistics is returned."""
         self.set_up_file('text')
@@ -264,3 +982,219 @@ class ApiRequestTestCase(TestCase):
         response = client.get(url)
         self.assertEqual(response.status_code, 200)
         self.assertJSONEqual(response.content, info)
+
+    def test_get_recent_words_top_query_param(self):
+        """Testing that specified in query param number of most and least
+        recent words is returned."""
+        self.set_up_file('test test test words words in a')
+        client = Client()
+        url = convert_to_url('/api/filesystem/' + test_file)
+        query_string = '/?get=most_recent,least_recent&top=2'
+        info = {
+            "most_recent": ["test", "words"],
+            "least_recent": ["a", "in"],
+        }
+        response = client.get(url + query_string)
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(response.content, info)
+
+        response = client.get(url + '/?top=0')
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_filesystem_folder_word_statistics(self):
+        """Testing that number of times the word meets in every file of the
+        folder is returned."""
+        self.set_up_file('text test text')
+        other_file = os.path.join(empty_dir, 'other.txt')
+        with open(file=other_file, mode='w', encoding='utf-8') as f:
+            f.write('other text')
+        client = Client()
+        url = convert_to_url('/api/filesystem/' + test_dir)
+        try:
+            response = client.get(url + '/?word=text&get=times_in_files')
+        finally:
+            os.remove(other_file)
+        info = {
+            "times_in_files": {
+                test_file: 2,
+                other_file: 1,
+            }
+        }
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(response.content, info)
+
+    def test_get_files_and_folders_pages(self):
+        """Testing that files and folders listing is returned page by page."""
+        self.set_up_file('text')
+        client = Client()
+        url = convert_to_url('/api/filesystem/' + test_dir)
+        response = client.get(url + '/?limit=2')
+        self.assertEqual(response.status_code, 200)
+        first_page = json.loads(response.content)
+        first_page_etag = response['ETag']
+        self.assertEqual(first_page['files_and_folders'],
+                         [test_dir, empty_dir])
+
+        response = client.get(
+            url + f'/?limit=2&cursor={first_page["next_cursor"]}')
+        self.assertEqual(response.status_code, 200)
+        info = {
+            "files_and_folders": [test_file],
+            "next_cursor": None,
+        }
+        self.assertJSONEqual(response.content, info)
+
+        response = client.get(url + '/?limit=2&cursor=wrong')
+        self.assertEqual(response.status_code, 400)
+
+        response = client.get(url + '/?limit=2',
+                              HTTP_IF_NONE_MATCH=first_page_etag)
+        self.assertEqual(response.status_code, 304)
+        response = client.get(url + '/?limit=2&get=number_of_files')
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_files_and_folders_stream(self):
+        """Testing that files and folders listing is streamed as JSON and
+        NDJSON."""
+        self.set_up_file('text')
+        client = Client()
+        url = convert_to_url('/api/filesystem/' + test_dir)
+        files_and_folders = [test_dir, empty_dir, test_file]
+
+        response = client.get(url + '/?stream=json')
+        self.assertEqual(response.status_code, 200)
+        content = b''.join(response.streaming_content)
+        self.assertJSONEqual(content, {"files_and_folders": files_and_folders})
+
+        response = client.get(url + '/?stream=ndjson')
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines],
+                         files_and_folders)
+
+        self.assertNotIn('ETag', response)
+
+
+class ThreadedApiRequestTestCase(TransactionTestCase):
+    """Async requests and jobs are handled in other threads, so test data is
+    committed to be seen by them"""
+
+    def setUp(self) -> None:
+        """Create test directories in project root folder."""
+        if not os.path.exists(test_dir):
+            os.mkdir(test_dir)
+            os.mkdir(empty_dir)
+        FILE_STATISTICS_CACHE.clear()
+        RESULTS_CACHE.clear()
+        with open(file=test_file, mode='w', encoding='utf-8') as f:
+            f.write('text')
+
+    def tearDown(self) -> None:
+        """Remove test directories and files."""
+        if os.path.exists(test_file):
+            os.remove(test_file)
+        if os.path.exists(test_dir):
+            os.rmdir(empty_dir)
+        if os.path.exists(test_dir):
+            os.rmdir(test_dir)
+
+    async def test_get_async_filesystem_statistics(self):
+        """Testing that async endpoint returns the same statistics as the
+        sync one for folders, files and words."""
+        client = AsyncClient()
+        url = convert_to_url('/api/async/filesystem/' + test_dir)
+        response = await client.get(url + '/', {'get': 'number_of_files'})
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(response.content, {'number_of_files': 1})
+
+        response = await client.get(url + '/test.txt/text/')
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(response.content, {
+            'times_in_text': 1, 'vowel_number': 1, 'consonant_number': 3})
+
+        response = await client.get(url + '/', {'stream': 'ndjson'})
+        self.assertEqual(response.status_code, 400)
+        response = await client.get(url + '/', {'limit': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['files_and_folders'], [test_dir])
+
+    def test_job_failed_save(self):
+        """Testing that job failing to save its status is saved as failed
+        instead of staying pending."""
+        job = IndexingJob.objects.create(url_path=test_dir, query_params={})
+        save = IndexingJob.save
+        errors = [OperationalError('database table is locked')]
+
+        def save_once_locked(self, *args, **kwargs):
+            if errors:
+                raise errors.pop()
+            save(self, *args, **kwargs)
+
+        with mock.patch.object(IndexingJob, 'save', save_once_locked):
+            run_job(job, lambda on_progress: {})
+        job.refresh_from_db()
+        self.assertEqual(job.status, IndexingJob.FAILED)
+        self.assertEqual(job.error, 'database table is locked')
+
+    def test_get_filesystem_statistics_job(self):
+        """Testing that statistics requested with 'async' query parameter are
+        gathered in the background job reporting its progress."""
+        client = Client()
+        url = convert_to_url('/api/filesystem/' + test_dir + '/')
+        futures = []
+        submit = JOB_EXECUTOR.submit
+        with mock.patch.object(
+                JOB_EXECUTOR, 'submit',
+                side_effect=lambda *args: futures.append(submit(*args)) or
+                futures[-1]):
+            response = client.get(url, {'get': 'total_words_number',
+                                        'async': '1'})
+        self.assertEqual(response.status_code, 202)
+        status_url = response.json()['status_url']
+        # Job is waited for, so its saves do not race with status requests
+        futures[0].result(timeout=30)
+
+        info = client.get(status_url).json()
+        self.assertEqual(info['status'], 'done')
+        self.assertEqual(info['result'], {'total_words_number': 1})
+        self.assertEqual((info['files_done'], info['files_total']), (1, 1))
+        self.assertEqual((info['bytes_done'], info['bytes_total']), (4, 4))
+
+        response = client.get('/api/jobs/0/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_get_filesystem_statistics_changed_in_flight(self):
+        """Testing that requests made after the folder changed neither share
+        nor wait for statistics gathered before the change."""
+        started = threading.Event()
+        release = threading.Event()
+        released = []
+        indexate = views.indexate
+
+        def slow_indexate(*args, **kwargs):
+            info = indexate(*args, **kwargs)
+            if not started.is_set():
+                started.set()
+                released.append(release.wait(5))
+            return info
+
+        url = convert_to_url('/api/filesystem/' + test_dir + '/')
+        params = {'get': 'total_words_number'}
+        results = []
+        with mock.patch.object(views, 'indexate', side_effect=slow_indexate):
+            leader = threading.Thread(
+                target=lambda: results.append(Client().get(url, params)))
+            leader.start()
+            started.wait(5)
+            with open(file=test_file, mode='w', encoding='utf-8') as f:
+                f.write('text of new version')
+            response = Client().get(url, params)
+            release.set()
+            leader.join(5)
+        # The first request is released by the second one, not by timeout
+        self.assertEqual(released, [True])
+        self.assertEqual(response.json(), {'total_words_number': 4})
+        self.assertEqual(results[0].json(), {'total_words_number': 1})
+        response = Client().get(url, params,
+                                HTTP_IF_NONE_MATCH=results[0]['ETag'])
+        self.assertEqual(response.json(), {'total_words_number': 4})
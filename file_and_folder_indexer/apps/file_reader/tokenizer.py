@@ -0,0 +1,162 @@
+import re
+from collections import Counter
+from string import ascii_lowercase
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from unidecode import unidecode
+
+from file_and_folder_indexer.apps.file_reader.planner import FULL_PLAN, Plan
+
+VOWELS = set("aeiou")
+CONSONANTS = set(ascii_lowercase).difference(VOWELS)
+# Matches continuous sequences of unicode alphanumeric characters except
+# digits and underscores. Besides Letters it can also match rare numeric
+# characters like '²' or '½', so matches are checked with str.isalpha
+WORD_PATTERN = re.compile(r'[^\W\d_]+')
+VOWEL_MARK = 'v'
+CONSONANT_MARK = 'c'
+
+
+def split_words(text: str) -> List[str]:
+    """
+    Split text into words: continuous sequences of any unicode Letter
+    characters
+    :param text: Text to split
+    :return: List of words in order of appearance
+    """
+    words = WORD_PATTERN.findall(text)
+    if all(map(str.isalpha, words)):
+        return words
+    letter_words = []
+    for word in words:
+        if word.isalpha():
+            letter_words.append(word)
+            continue
+        letters = ''
+        for char in word:
+            if char.isalpha():
+                letters += char
+            elif letters:
+                letter_words.append(letters)
+                letters = ''
+        if letters:
+            letter_words.append(letters)
+    return letter_words
+
+
+def iter_words(blocks: Iterable[str]) -> Iterator[List[str]]:
+    """
+    Split text blocks into words keeping words cut across block boundaries
+    :param blocks: Text blocks in order of appearance
+    :return: Lists of complete words for each block
+    """
+    tail = ''
+    for block in blocks:
+        if not block:
+            continue
+        block = tail + block
+        words = split_words(block)
+        # Last word may continue in the next block
+        tail = words.pop() if block[-1].isalpha() else ''
+        yield words
+    if tail:
+        yield [tail]
+
+
+class LetterClassTable(dict):
+    """
+    Translation table for str.translate mapping Letter characters code points
+    to VOWEL_MARK or CONSONANT_MARK and deleting all other characters.
+    Table is filled lazily by transliterating every new character to ascii
+    only once
+    """
+
+    def __missing__(self, code_point: int) -> Optional[str]:
+        char = chr(code_point)
+        mark = None
+        if char.isalpha():
+            ascii_chars = set(unidecode(char.lower()))
+            if ascii_chars.issubset(VOWELS):
+                mark = VOWEL_MARK
+            elif ascii_chars.issubset(CONSONANTS):
+                mark = CONSONANT_MARK
+        self[code_point] = mark
+        return mark
+
+
+LETTER_CLASSES = LetterClassTable()
+
+
+def count_letters(text: str) -> Tuple[int, int]:
+    """
+    Count vowels and consonants in text
+    :param text: Text to check
+    :return: Number of vowels and number of consonants
+    """
+    marks = text.translate(LETTER_CLASSES)
+    return marks.count(VOWEL_MARK), marks.count(CONSONANT_MARK)
+
+
+def tokenize(blocks: Iterable[str], statistics,
+             plan: Plan = FULL_PLAN) -> None:
+    """
+    Gather words, vowels and consonants statistics from text blocks
+    :param blocks: Text blocks in order of appearance. If blocks have
+    'tokenize' method, like MappedText, it gathers statistics instead
+    :param statistics: Statistics to add gathered information to
+    :param plan: Statistics to gather, all by default
+    """
+    if hasattr(blocks, 'tokenize'):
+        blocks.tokenize(statistics, plan)
+    elif plan.words:
+        count_words(blocks, statistics)
+    elif plan.totals:
+        for words in iter_words(blocks):
+            statistics.total_words_number += len(words)
+            statistics.total_words_length += sum(map(len, words))
+            if plan.letters:
+                vowel_number, consonant_number = count_letters(
+                    ''.join(words))
+                statistics.vowel_number += vowel_number
+                statistics.consonant_number += consonant_number
+    elif plan.letters:
+        # Not Letter characters are ignored, so text is not split into words
+        for block in blocks:
+            vowel_number, consonant_number = count_letters(block)
+            statistics.vowel_number += vowel_number
+            statistics.consonant_number += consonant_number
+
+
+def count_words(blocks: Iterable[str], statistics) -> None:
+    """
+    Gather frequency of every word and words, vowels and consonants numbers
+    from text blocks
+    :param blocks: Text blocks in order of appearance
+    :param statistics: Statistics to add gathered information to
+    """
+    words_counter = Counter()
+    for words in iter_words(blocks):
+        words_counter.update(words)
+    add_word_counts(words_counter, statistics)
+
+
+def add_word_counts(words_counter: Counter, statistics,
+                    plan: Plan = FULL_PLAN) -> None:
+    """
+    Add statistics of counted words
+    :param words_counter: Number of times every word meets in the text
+    :param statistics: Statistics to add gathered information to
+    :param plan: Statistics to gather, all by default
+    """
+    if plan.words:
+        statistics.update_unique_words(words_counter)
+    # Letters are classified once per unique word instead of once per
+    # character of the text
+    for word, count in words_counter.items():
+        if plan.words or plan.totals:
+            statistics.total_words_number += count
+            statistics.total_words_length += len(word) * count
+        if plan.words or plan.letters:
+            vowel_number, consonant_number = count_letters(word)
+            statistics.vowel_number += vowel_number * count
+            statistics.consonant_number += consonant_number * count
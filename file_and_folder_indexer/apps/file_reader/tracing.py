@@ -0,0 +1,175 @@
+import cProfile
+import heapq
+import io
+import os
+import pstats
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from file_and_folder_indexer.apps.file_reader.metrics import METRICS
+
+# Number of the slowest read files reported by the trace
+SLOWEST_FILES = 10
+# Number of functions in the profile report
+PROFILE_LINES = 30
+
+
+class RequestTrace:
+    """Wall time of statistics gathering stages, counters of processed
+    files and the slowest read files of a single request"""
+
+    def __init__(self, slowest_files: int = SLOWEST_FILES) -> None:
+        self.stages: Dict[str, float] = {}
+        self.counters: Counter = Counter()
+        self.slowest_files = slowest_files
+        # Seconds, path, size, encoding and number of encodings tried
+        self.files: List[Tuple[float, str, int, str, int]] = []
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        """Add wall time of the stage, stages can run many times"""
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def add_file(self, path: str, size: int, seconds: float,
+                 encoding: Optional[str], encodings_tried: int) -> None:
+        """Count the read file and keep it if it is one of the slowest"""
+        self.counters['files_parsed'] += 1
+        self.counters['bytes_read'] += size
+        if encodings_tried > 1:
+            self.counters['encoding_fallbacks'] += encodings_tried - 1
+        file = (seconds, path, size, encoding or '', encodings_tried)
+        if len(self.files) < self.slowest_files:
+            heapq.heappush(self.files, file)
+        else:
+            heapq.heappushpop(self.files, file)
+
+    def as_dict(self) -> Dict:
+        """Get stages in milliseconds, counters and the slowest files"""
+        return {
+            'stages_ms': {name: round(seconds * 1000, 3)
+                          for name, seconds in self.stages.items()},
+            'counters': dict(self.counters),
+            'slowest_files': [
+                {'path': path, 'ms': round(seconds * 1000, 3), 'bytes': size,
+                 'encoding': encoding, 'encodings_tried': encodings_tried}
+                for seconds, path, size, encoding, encodings_tried
+                in sorted(self.files, reverse=True)],
+        }
+
+    def server_timing(self) -> str:
+        """Get stages as Server-Timing header value"""
+        return ', '.join(f'{name};dur={seconds * 1000:.3f}'
+                         for name, seconds in self.stages.items())
+
+
+# Trace of the request being handled, None if it is not traced
+CURRENT_TRACE: ContextVar[Optional[RequestTrace]] = ContextVar(
+    'current_trace', default=None)
+
+
+@contextmanager
+def tracing(trace: RequestTrace) -> Iterator[RequestTrace]:
+    """
+    Trace statistics gathering in the block
+    :param trace: Trace to collect stages and counters to
+    """
+    token = CURRENT_TRACE.set(trace)
+    try:
+        yield trace
+    finally:
+        CURRENT_TRACE.reset(token)
+
+
+@contextmanager
+def trace_stage(name: str) -> Iterator[None]:
+    """
+    Add wall time of the block to the stage of the current trace
+    :param name: Stage name
+    """
+    trace = CURRENT_TRACE.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_stage(name, time.perf_counter() - start)
+
+
+def trace_iterator(name: str, iterable: Iterable) -> Iterator:
+    """
+    Add time spent getting items of the iterable to the stage of the
+    current trace, time spent by the caller on the items is not added
+    :param name: Stage name
+    :param iterable: Iterable to trace
+    :return: Items of the iterable
+    """
+    iterator = iter(iterable)
+    while True:
+        with trace_stage(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def count(name: str, value: int = 1) -> None:
+    """
+    Add value to the counter of the current trace and to the process
+    metrics
+    :param name: Counter name
+    :param value: Value to add
+    """
+    METRICS.count(name, value)
+    trace = CURRENT_TRACE.get()
+    if trace is not None:
+        trace.counters[name] += value
+
+
+def trace_file(path: str, size: int, seconds: float, encoding: Optional[str],
+               encodings_tried: int) -> None:
+    """
+    Add the read file to the current trace and to the process metrics
+    :param path: File path
+    :param size: File size in bytes
+    :param seconds: Time taken to read the file
+    :param encoding: Encoding the file was read with, None if it could not
+    be read
+    :param encodings_tried: Number of encodings tried to read the file with
+    """
+    METRICS.add_file(size, seconds, encodings_tried)
+    trace = CURRENT_TRACE.get()
+    if trace is not None:
+        trace.add_file(path, size, seconds, encoding, encodings_tried)
+
+
+def get_profile_report(profiler: cProfile.Profile,
+                       lines: int = PROFILE_LINES) -> List[str]:
+    """
+    Get functions taking the most cumulative time
+    :param profiler: Disabled profiler
+    :param lines: Max number of functions
+    :return: Lines of pstats report
+    """
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(lines)
+    return [line for line in stream.getvalue().splitlines() if line.strip()]
+
+
+def save_profile(profiler: cProfile.Profile, folder: str) -> str:
+    """
+    Save profile in pstats format to be opened by pstats or snakeviz
+    :param profiler: Disabled profiler
+    :param folder: Folder to save profile to
+    :return: Profile file path
+    """
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f'{time.strftime("%Y%m%d-%H%M%S")}-'
+                                f'{os.getpid()}-{time.monotonic_ns()}.prof')
+    profiler.dump_stats(path)
+    return path
@@ -5,3 +5,15 @@ from file_and_folder_indexer.apps.file_reader import views
 filesystem_urlpatterns = [
     path('<path:url_path>/', views.filesystem_view),
 ]
+
+async_filesystem_urlpatterns = [
+    path('<path:url_path>/', views.async_filesystem_view),
+]
+
+jobs_urlpatterns = [
+    path('<int:job_id>/', views.job_view, name='job'),
+]
+
+metrics_urlpatterns = [
+    path('', views.metrics_view, name='metrics'),
+]
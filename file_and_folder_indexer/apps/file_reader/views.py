@@ -1,15 +1,143 @@
+import cProfile
+import hashlib
 import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, Set, Tuple
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
 from django.http import (HttpResponse, HttpResponseBadRequest,
-                         HttpResponseNotFound)
-from django.urls import path
+                         HttpResponseNotFound, StreamingHttpResponse)
+from django.urls import path, reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework.decorators import api_view
 
+from file_and_folder_indexer.apps.file_reader.apps import FileReaderConfig
+from file_and_folder_indexer.apps.file_reader.cache import RESULTS_CACHE
+from file_and_folder_indexer.apps.file_reader.coalescing import (
+    coalesce, get_request_key)
 from file_and_folder_indexer.apps.file_reader.conversion import (
-    convert_to_path, split_params)
+    convert_to_path, convert_to_positive_int, decode_cursor, encode_cursor,
+    split_params)
 from file_and_folder_indexer.apps.file_reader.indexer import (
-    FileSystemException, Statistics, indexate)
+    TOP_N, FileSystemException, Statistics, get_path_target, get_path_version,
+    indexate, iter_objects, walk_folder)
+from file_and_folder_indexer.apps.file_reader.jobs import start_job
+from file_and_folder_indexer.apps.file_reader.metrics import (CONTENT_TYPE,
+                                                              METRICS)
+from file_and_folder_indexer.apps.file_reader.models import IndexingJob
+from file_and_folder_indexer.apps.file_reader.planner import (
+    get_requested_fields, plan_statistics)
+from file_and_folder_indexer.apps.file_reader.readers import get_reader
+from file_and_folder_indexer.apps.file_reader.tracing import (
+    RequestTrace, get_profile_report, save_profile, trace_stage, tracing)
+
+# Number of listed paths sent to the client at once in streaming responses
+STREAM_CHUNK_SIZE = 1000
+# Modes of 'debug' query parameter of statistics requests
+DEBUG_MODES = {'timings', 'profile'}
+# cProfile profiles every thread of the process, so one request is profiled
+# at a time
+PROFILE_LOCK = threading.Lock()
+# Executors running async requests by request type
+REQUEST_EXECUTORS = {
+    'scan': ThreadPoolExecutor(max_workers=FileReaderConfig.scan_threads,
+                               thread_name_prefix='scan'),
+    'lookup': ThreadPoolExecutor(max_workers=FileReaderConfig.lookup_threads,
+                                 thread_name_prefix='lookup'),
+}
+
+
+def stream_json_listing(paths: Iterator[str]) -> Iterator[str]:
+    """
+    Write files and folders listing as JSON object piece by piece
+    :param paths: Paths of files and folders
+    :return: Parts of JSON document
+    """
+    yield '{\n    "files_and_folders": ['
+    separator = '\n'
+    chunk = []
+    for object_path in paths:
+        chunk.append(separator + ' ' * 8 +
+                     json.dumps(object_path, ensure_ascii=False))
+        separator = ',\n'
+        if len(chunk) >= STREAM_CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    yield ''.join(chunk) + '\n    ]\n}'
+
+
+def stream_ndjson_listing(paths: Iterator[str]) -> Iterator[str]:
+    """
+    Write files and folders listing as newline delimited JSON strings
+    :param paths: Paths of files and folders
+    :return: Lines of NDJSON document
+    """
+    chunk = []
+    for object_path in paths:
+        chunk.append(json.dumps(object_path, ensure_ascii=False) + '\n')
+        if len(chunk) >= STREAM_CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    yield ''.join(chunk)
+
+
+def listing_response(request, path: str, query_params: Dict
+                     ) -> HttpResponse:
+    """
+    Get files and folders listing of the folder page by page or as a
+    streaming response, so the whole listing is never kept in memory. Pages
+    have ETag header, requests with If-None-Match header get 304 Not
+    Modified if the page did not change. Streams have no ETag, it would
+    take walking the folder before streaming it
+    :param request: Get HTTP request
+    :param path: Folder path
+    :param query_params: 'limit' and 'cursor' query parameters to get one
+    page of listing, 'stream' query parameter set to 'json' or 'ndjson' to
+    stream the whole listing
+    :return: Listing response
+    """
+    statistics, _ = parse_statistics_request(query_params)
+    if set(get_requested_fields(statistics)) - {'files_and_folders'}:
+        raise ValueError("Only files_and_folders are listed with 'limit' or "
+                         "'stream'.")
+
+    if 'limit' in query_params:
+        limit = convert_to_positive_int(query_params['limit'])
+        cursor = query_params.get('cursor')
+        after = decode_cursor(cursor) if cursor else None
+        # One more path is taken to find out whether there is a next page.
+        # Listing continues after the last listed path, so pages do not
+        # walk folders listed before them
+        page = list(iter_objects(path, after, limit + 1))
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = encode_cursor(page[-1])
+        info = {'files_and_folders': page, 'next_cursor': next_cursor}
+        info = json.dumps(info, indent=4, ensure_ascii=False)
+        # Page is small, so its ETag is the hash of its content
+        etag = quote_etag(hashlib.sha256(info.encode()).hexdigest()[:32])
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(info, content_type='application/json')
+        response['ETag'] = etag
+        return response
+
+    stream_format = query_params['stream']
+    if stream_format == 'json':
+        return StreamingHttpResponse(stream_json_listing(iter_objects(path)),
+                                     content_type='application/json')
+    if stream_format == 'ndjson':
+        return StreamingHttpResponse(
+            stream_ndjson_listing(iter_objects(path)),
+            content_type='application/x-ndjson')
+    raise ValueError(f'{stream_format} stream format is not supported.')
 
 
 @swagger_auto_schema(
@@ -32,6 +160,57 @@ def filesystem_view(request, url_path: path = None,):
 
     If no query parameters are specified, returns all types of statistics.
 
+    If 'workers' query parameter is specified, files of the folder are read
+    with at most that number of worker processes.
+
+    If 'top' query parameter is specified, returns that number of most and
+    least recent words.
+
+    If 'word' query parameter is specified for a folder, returns number of
+    times the word meets in every text file of the folder.
+
+    If 'limit' query parameter is specified for a folder, returns only one
+    page of files and folders listing and a cursor to pass in 'cursor' query
+    parameter to get the next page. If 'stream' query parameter is set to
+    'json' or 'ndjson' for a folder, streams the whole listing.
+
+    If 'async' query parameter is set to 1, statistics are gathered in the
+    background and the job id is returned right away with the job status
+    URL.
+
+    If 'debug' query parameter is set to 'timings', statistics are gathered
+    again without the responses cache and returned with wall time of
+    gathering stages, counters of read files and of statistics taken from
+    the file statistics cache and index, and the slowest files in 'debug'
+    field and Server-Timing header. 'profile' adds cProfile report of the
+    slowest functions, one request is profiled at a time.
+
+    Statistics responses have ETag header. Requests with If-None-Match header
+    get 304 Not Modified if nothing under the path changed, files are not
+    read then.
+
+    :param request: Get HTTP request
+    :param url_path: Path to check
+    :return: Statistics about folder, file or word in the text if path is
+    valid, else Bad Request or Not Found error
+    """
+    if not url_path:
+        return HttpResponseBadRequest("Specify path to folder, file or word"
+                                      "in the text file.")
+    return filesystem_response(request, url_path)
+
+
+async def async_filesystem_view(request, url_path: path = None):
+    """
+    Get HTTP response with statistics about folder, file or word in the text
+    like filesystem_view does without blocking the event loop. Requests are
+    handled in the executor of their type, so big folder scans do not hold
+    up file and word lookups.
+
+    Listings are not streamed: streaming responses are iterated in the event
+    loop, so 'stream' query parameter is rejected, 'limit' pages are
+    returned instead.
+
     :param request: Get HTTP request
     :param url_path: Path to check
     :return: Statistics about folder, file or word in the text if path is
@@ -40,22 +219,278 @@ def filesystem_view(request, url_path: path = None,):
     if not url_path:
         return HttpResponseBadRequest("Specify path to folder, file or word"
                                       "in the text file.")
+    if 'stream' in request.GET:
+        return HttpResponseBadRequest("Listings are not streamed by the async "
+                                      "endpoint, use 'limit' query parameter "
+                                      "to get them page by page.")
+    executor = REQUEST_EXECUTORS[get_request_type(url_path)]
+    render = sync_to_async(render_filesystem_response, thread_sensitive=False,
+                           executor=executor)
+    return await render(request, url_path)
+
+
+def get_request_type(url_path: str) -> str:
+    """
+    Guess request type by the path without touching the file system
+    :param url_path: Path to check
+    :return: 'lookup' for files and words in files, 'scan' for folders
+    """
+    url_path = url_path.rstrip('/')
+    if (get_reader(os.path.splitext(url_path)[1]) or
+            get_reader(os.path.splitext(os.path.dirname(url_path))[1])):
+        return 'lookup'
+    return 'scan'
+
+
+def render_filesystem_response(request, url_path: str) -> HttpResponse:
+    """
+    Get response to the filesystem request closing database connections of
+    the executor thread afterwards
+    :param request: Get HTTP request without 'stream' query parameter
+    :param url_path: Path to check
+    :return: Response with content
+    """
+    try:
+        return filesystem_response(request, url_path)
+    finally:
+        close_old_connections()
+
+
+def filesystem_response(request, url_path: str) -> HttpResponse:
+    """
+    Get response to the filesystem request timed in request metrics by the
+    requested path type, cached and error responses included
+    :param request: Get HTTP request
+    :param url_path: Path to check
+    :return: Statistics about folder, file or word in the text if path is
+    valid, else Bad Request or Not Found error
+    """
+    try:
+        target = get_path_target(convert_to_path(url_path)) or 'unknown'
+    except ValueError:
+        target = 'unknown'
+    with METRICS.observe_request(target):
+        response = get_filesystem_response(request, url_path)
+        if response.status_code >= 400:
+            METRICS.count_error(target)
+    return response
+
+
+def get_filesystem_response(request, url_path: str) -> HttpResponse:
+    """
+    Get response to the filesystem request
+    :param request: Get HTTP request
+    :param url_path: Path to check
+    :return: Statistics about folder, file or word in the text if path is
+    valid, else Bad Request or Not Found error
+    """
     try:
         path = convert_to_path(url_path)
     except ValueError as err:
         return HttpResponseBadRequest(err)
 
-    statistics = Statistics()
     query_params = request.GET.dict()
+    if (os.path.isdir(path) and
+            ('limit' in query_params or 'stream' in query_params)):
+        try:
+            return listing_response(request, path, query_params)
+        except ValueError as err:
+            return HttpResponseBadRequest(err)
+
+    try:
+        statistics, options = parse_statistics_request(query_params)
+    except ValueError as err:
+        return HttpResponseBadRequest(err)
+
+    if query_params.get('async') in ('1', 'true'):
+        job = start_job(url_path, query_params, lambda on_progress: indexate(
+            path, statistics, on_progress=on_progress, **options))
+        info = {
+            'job_id': job.pk,
+            'status': job.status,
+            'status_url': reverse('job', args=[job.pk]),
+        }
+        info = json.dumps(info, indent=4, ensure_ascii=False)
+        return HttpResponse(info, status=202, content_type='application/json')
+
+    debug = set(split_params(query_params.get('debug', '')))
+    if debug:
+        debug_requests = FileReaderConfig.debug_requests
+        if debug_requests is None:
+            debug_requests = settings.DEBUG
+        if not debug_requests:
+            return HttpResponseBadRequest('Debug requests are disabled.')
+        if not debug.issubset(DEBUG_MODES):
+            return HttpResponseBadRequest(
+                f'Debug modes are {", ".join(sorted(DEBUG_MODES))}.')
+        return debug_response(path, statistics, options, debug)
+
+    # Concurrent equal requests of the same version share a single indexate
+    # call, number of workers does not change statistics
+    key = get_request_key(path, get_requested_fields(statistics),
+                          {'top_n': options['top_n'], 'word': options['word']})
+    # Statistics stay the same until anything under the path changes, so
+    # clients having them get 304 without files being read. The folder is
+    # walked once for both the version and the statistics
+    folder_tree = walk_folder(path)
+    version = get_path_version(path, folder_tree)
+    if version is not None:
+        etag = quote_etag(hashlib.sha256(
+            f'{key} {version}'.encode()).hexdigest()[:32])
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            return response
+
+    try:
+        info = RESULTS_CACHE.get((key, version)) if version else None
+        if info is None:
+            # Statistics shared with other requests are gathered from the
+            # same version, so they match the ETag and the cache key. Only
+            # folder scans reading files are done one at a time across
+            # processes, file and word lookups take no database writes
+            scan = (folder_tree is not None and plan_statistics(
+                get_requested_fields(statistics)).parse)
+            info = coalesce(key, lambda: indexate(
+                path, statistics, folder_tree=folder_tree, **options),
+                version, across_processes=scan)
+            if version is not None:
+                RESULTS_CACHE.put((key, version), info)
+        info = json.dumps(info, indent=4, ensure_ascii=False)
+        response = HttpResponse(info, content_type='application/json')
+    except FileSystemException as err:
+        return HttpResponseNotFound(err)
+    if version is not None:
+        response['ETag'] = etag
+    return response
+
+
+def debug_response(path: str, statistics: Statistics, options: Dict,
+                   debug: Set[str]) -> HttpResponse:
+    """
+    Get statistics gathered with stages timed, caches of responses and
+    sharing of equal requests are skipped, file statistics cache and index
+    are used as by other requests and counted
+    :param path: Normalized path
+    :param statistics: Requested statistics
+    :param options: Keyword arguments of indexate
+    :param debug: Debug modes, 'timings' and 'profile' of indexate call
+    :return: Statistics with 'debug' information and Server-Timing header
+    """
+    trace = RequestTrace()
+    profiler = None
+    if 'profile' in debug:
+        if not PROFILE_LOCK.acquire(blocking=False):
+            return HttpResponse('Another request is being profiled.',
+                                status=409)
+        profiler = cProfile.Profile()
+    with tracing(trace):
+        try:
+            with trace_stage('indexate'):
+                try:
+                    if profiler:
+                        profiler.enable()
+                    info = indexate(path, statistics, **options)
+                finally:
+                    if profiler:
+                        profiler.disable()
+                        PROFILE_LOCK.release()
+        except FileSystemException as err:
+            return HttpResponseNotFound(err)
+        with trace_stage('serialize'):
+            json.dumps(info, indent=4, ensure_ascii=False)
+
+    info['debug'] = trace.as_dict()
+    if profiler:
+        info['debug']['profile'] = get_profile_report(profiler)
+        if FileReaderConfig.profiles_folder:
+            info['debug']['profile_file'] = save_profile(
+                profiler, FileReaderConfig.profiles_folder)
+    info = json.dumps(info, indent=4, ensure_ascii=False)
+    response = HttpResponse(info, content_type='application/json')
+    response['Server-Timing'] = trace.server_timing()
+    return response
+
+
+def parse_statistics_request(query_params: Dict) -> Tuple[Statistics, Dict]:
+    """
+    Get requested statistics and options of their gathering
+    :param query_params: Query parameters of the request
+    :return: Statistics with requested fields set to True and keyword
+    arguments of indexate
+    """
+    statistics = Statistics()
     if 'get' in query_params:
         params_list = split_params(query_params.get('get'))
         for param in params_list:
             if param in statistics.__dict__:
                 setattr(statistics, param, True)
 
-    try:
-        statistics = indexate(path, statistics)
-        statistics = json.dumps(statistics, indent=4, ensure_ascii=False)
-        return HttpResponse(statistics, content_type='application/json')
-    except FileSystemException as err:
-        return HttpResponseNotFound(err)
+    workers = query_params.get('workers')
+    if workers is not None:
+        workers = convert_to_positive_int(workers)
+    top_n = convert_to_positive_int(query_params.get('top', str(TOP_N)))
+    return statistics, {'workers': workers, 'top_n': top_n,
+                        'word': query_params.get('word')}
+
+
+@swagger_auto_schema(
+    method='get',
+    operation_summary="Get status and result of background statistics "
+                      "request",
+    responses={
+        '200': 'Ok',
+        '404': 'Job not found',
+    }
+)
+@api_view(['GET'])
+def job_view(request, job_id: int):
+    """
+    Get HTTP response with status and progress of the statistics request
+    started with 'async' query parameter. Progress is given as numbers of
+    files and bytes done and to do. Statistics are returned once the job is
+    done, error message if it failed.
+
+    :param request: Get HTTP request
+    :param job_id: Job id
+    :return: Job status, progress and result or Not Found error
+    """
+    job = IndexingJob.objects.filter(pk=job_id).first()
+    if job is None:
+        return HttpResponseNotFound('No such job.')
+    info = {
+        'job_id': job.pk,
+        'url_path': job.url_path,
+        'status': job.status,
+        'files_done': job.files_done,
+        'files_total': job.files_total,
+        'bytes_done': job.bytes_done,
+        'bytes_total': job.bytes_total,
+    }
+    if job.status == IndexingJob.DONE:
+        info['result'] = job.result
+    if job.status == IndexingJob.FAILED:
+        info['error'] = job.error
+    info = json.dumps(info, indent=4, ensure_ascii=False)
+    return HttpResponse(info, content_type='application/json')
+
+
+@swagger_auto_schema(
+    method='get',
+    operation_summary="Get indexer metrics in Prometheus text format",
+    responses={
+        '200': 'Ok',
+    }
+)
+@api_view(['GET'])
+def metrics_view(request):
+    """
+    Get HTTP response with metrics of statistics gathering in the server
+    process since it started: request duration histograms, numbers of
+    requests in progress and failed by requested path type, numbers of read
+    files and bytes, time spent reading them, encoding fallbacks, statistics
+    taken from the index and hit ratios of caches.
+
+    :param request: Get HTTP request
+    :return: Metrics in Prometheus text format
+    """
+    return HttpResponse(METRICS.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,247 @@
+import os
+import sys
+import threading
+from array import array
+from collections.abc import Mapping
+from heapq import nlargest, nsmallest
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Type code of arrays of word ids, up to 2 ** 32 different words
+ID_TYPECODE = 'I'
+# Type code of arrays of word counts
+COUNT_TYPECODE = 'Q'
+
+
+class Vocabulary:
+    """Words of all word frequency tables of the process, every word is
+    stored once and has an integer id. Every word counts tables holding it,
+    a word is removed once no table holds it and its id is given to the next
+    new word, so the vocabulary holds only words of living tables"""
+
+    def __init__(self) -> None:
+        # Tables are released by the garbage collector, also while words
+        # of other tables are added
+        self.lock = threading.RLock()
+        self.ids: Dict[str, int] = {}
+        self.words: List[Optional[str]] = []
+        self.references = array(ID_TYPECODE)
+        self.free_ids: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def after_fork_in_child(self) -> None:
+        """Replace the lock in the forked process, its state is copied
+        from the forking thread, which held it"""
+        self.lock = threading.RLock()
+
+    def get_ids(self, words: Iterable[str]) -> array:
+        """
+        Get ids of words adding new words to the vocabulary, words are held
+        until the ids are released
+        :param words: Different words
+        :return: Word ids in order of words
+        """
+        ids, references = self.ids, self.references
+        word_ids = array(ID_TYPECODE)
+        with self.lock:
+            for word in words:
+                word_id = ids.get(word)
+                if word_id is None:
+                    if self.free_ids:
+                        word_id = self.free_ids.pop()
+                        self.words[word_id] = word
+                    else:
+                        word_id = len(self.words)
+                        self.words.append(word)
+                        references.append(0)
+                    ids[word] = word_id
+                references[word_id] += 1
+                word_ids.append(word_id)
+        return word_ids
+
+    def hold(self, word_ids: array) -> None:
+        """
+        Hold words of one more table
+        :param word_ids: Ids of different words
+        """
+        references = self.references
+        with self.lock:
+            for word_id in word_ids:
+                references[word_id] += 1
+
+    def release(self, word_ids: array) -> None:
+        """
+        Release words of the table, words held by no table are removed
+        :param word_ids: Ids of different words
+        """
+        ids, words, references = self.ids, self.words, self.references
+        with self.lock:
+            for word_id in word_ids:
+                references[word_id] -= 1
+                if not references[word_id]:
+                    del ids[words[word_id]]
+                    words[word_id] = None
+                    self.free_ids.append(word_id)
+
+
+# Vocabulary of the process shared by all word frequency tables
+VOCABULARY = Vocabulary()
+if hasattr(os, 'register_at_fork'):
+    # Worker processes forked while another thread held the lock would wait
+    # for it forever, so the lock is held by the forking thread while the
+    # process forks and the child gets a new one
+    os.register_at_fork(before=lambda: VOCABULARY.lock.acquire(),
+                        after_in_parent=lambda: VOCABULARY.lock.release(),
+                        after_in_child=VOCABULARY.after_fork_in_child)
+
+
+class WordCounts(Mapping):
+    """Number of times every word meets in the text in order of first
+    appearance. Words are kept as ids of the process vocabulary and counts
+    in arrays, so a table takes 12 bytes per word instead of a dict entry
+    with its own string. Tables are not changed once created, so they are
+    shared by cached and returned statistics. Looking up a single word
+    takes linear time, word index is used for lookups"""
+
+    __slots__ = ('ids', 'counts')
+
+    def __init__(self, words: Mapping = None) -> None:
+        self.ids = array(ID_TYPECODE)
+        self.counts = array(COUNT_TYPECODE)
+        if isinstance(words, WordCounts):
+            VOCABULARY.hold(words.ids)
+            self.ids, self.counts = words.ids[:], words.counts[:]
+        elif words:
+            self.counts = array(COUNT_TYPECODE, words.values())
+            self.ids = VOCABULARY.get_ids(words.keys())
+
+    def __del__(self) -> None:
+        # Ids are released only once they are held, so a table failed to be
+        # created releases nothing
+        if self.ids and VOCABULARY is not None:
+            VOCABULARY.release(self.ids)
+
+    @classmethod
+    def from_mapping(cls, words: Mapping) -> 'WordCounts':
+        """
+        Get table of word counts of any mapping
+        :param words: Word counts
+        :return: The mapping itself if it is a table already, else new table
+        """
+        if isinstance(words, cls):
+            return words
+        return cls(words)
+
+    @classmethod
+    def from_words(cls, words: List[str], counts: array) -> 'WordCounts':
+        """
+        Get table of words and their counts, words are added to the
+        vocabulary of the process
+        :param words: Words in order of appearance
+        :param counts: Counts of words
+        :return: Word counts
+        """
+        word_counts = cls()
+        word_counts.counts = counts
+        word_counts.ids = VOCABULARY.get_ids(words)
+        return word_counts
+
+    @classmethod
+    def merge(cls, tables: Iterable[Mapping]) -> 'WordCounts':
+        """
+        Sum counts of any number of tables, words go in order of first
+        appearance. Takes time linear in the number of words of tables
+        :param tables: Tables to sum, any mappings of words to counts
+        :return: Table with summed counts, the only not empty table itself
+        """
+        tables = [cls.from_mapping(table) for table in tables if table]
+        if len(tables) == 1:
+            return tables[0]
+        ids = array(ID_TYPECODE)
+        counts = array(COUNT_TYPECODE)
+        positions = {}
+        for table in tables:
+            for word_id, count in zip(table.ids, table.counts):
+                position = positions.get(word_id)
+                if position is None:
+                    positions[word_id] = len(ids)
+                    ids.append(word_id)
+                    counts.append(count)
+                else:
+                    counts[position] += count
+        merged = cls()
+        # Words are held by the merged tables while they are merged
+        VOCABULARY.hold(ids)
+        merged.ids, merged.counts = ids, counts
+        return merged
+
+    def __reduce__(self) -> Tuple:
+        # Ids are valid only in the vocabulary of this process, so words are
+        # sent to other processes, counts go as a single buffer
+        return WordCounts.from_words, (list(self), self.counts)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[str]:
+        words = VOCABULARY.words
+        return (words[word_id] for word_id in self.ids)
+
+    def __getitem__(self, word: str) -> int:
+        word_id = VOCABULARY.ids.get(word)
+        if word_id is None:
+            raise KeyError(word)
+        try:
+            return self.counts[self.ids.index(word_id)]
+        except ValueError:
+            raise KeyError(word) from None
+
+    def __sizeof__(self) -> int:
+        # Table is measured as if it held its own words, so caches of
+        # tables count the vocabulary words they keep alive
+        words = VOCABULARY.words
+        return (object.__sizeof__(self) + sys.getsizeof(self.ids) +
+                sys.getsizeof(self.counts) +
+                sum(sys.getsizeof(words[word_id]) for word_id in self.ids))
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self.as_dict()!r})'
+
+    def items(self) -> Iterator[Tuple[str, int]]:
+        """Get words with their counts in order of appearance"""
+        return zip(self, self.counts)
+
+    def values(self) -> array:
+        """Get counts of words in order of appearance"""
+        return self.counts
+
+    def as_dict(self) -> Dict[str, int]:
+        """Get word counts as dict, e.g. to be stored as JSON object"""
+        return dict(self.items())
+
+    def get_most_common(self, top_n: int) -> List[str]:
+        """
+        Get most common words, equally common words go in order of
+        appearance
+        :param top_n: Number of words
+        :return: Words
+        """
+        words = VOCABULARY.words
+        positions = nlargest(top_n, range(len(self.counts)),
+                             key=self.counts.__getitem__)
+        return [words[self.ids[position]] for position in positions]
+
+    def get_least_common(self, top_n: int) -> List[str]:
+        """
+        Get least common words, equally common words go in reverse order of
+        appearance
+        :param top_n: Number of words
+        :return: Words
+        """
+        words = VOCABULARY.words
+        counts = self.counts
+        positions = nsmallest(top_n, range(len(counts)),
+                              key=lambda position: (counts[position],
+                                                    -position))
+        return [words[self.ids[position]] for position in positions]
@@ -0,0 +1,319 @@
+import logging
+import os
+import stat
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+
+from file_and_folder_indexer.apps.file_reader.apps import FileReaderConfig
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FileSystemEntry:
+    path: str
+    mode: int
+    size: int
+    mtime_ns: int
+    inode: int
+    device: int
+    is_symlink: bool = False
+
+    @classmethod
+    def from_stat(cls, path: str, stat_result: os.stat_result,
+                  is_symlink: bool = False) -> 'FileSystemEntry':
+        """
+        Get entry from the result of stat call
+        :param path: Entry path
+        :param stat_result: Stat call result
+        :param is_symlink: Whether the entry is a symlink, stat result is of
+        its target then unless the symlink is broken
+        :return: File system entry
+        """
+        return cls(
+            path=path,
+            mode=stat_result.st_mode,
+            size=stat_result.st_size,
+            mtime_ns=stat_result.st_mtime_ns,
+            inode=stat_result.st_ino,
+            device=stat_result.st_dev,
+            is_symlink=is_symlink,
+        )
+
+    @property
+    def is_dir(self) -> bool:
+        return stat.S_ISDIR(self.mode)
+
+    @property
+    def is_file(self) -> bool:
+        return stat.S_ISREG(self.mode)
+
+    @property
+    def extension(self) -> str:
+        return os.path.splitext(self.path)[1]
+
+    @property
+    def signature(self) -> Tuple[int, int, int]:
+        """Values changed on every file modification"""
+        return self.size, self.mtime_ns, self.inode
+
+
+# Folder entry with entries of its subfolders and files
+FolderEntries = Tuple[FileSystemEntry, List[FileSystemEntry],
+                      List[FileSystemEntry]]
+
+
+def get_entry(path: str) -> FileSystemEntry:
+    """
+    Get file system entry of the path
+    :param path: Path to check
+    :return: File system entry
+    """
+    return FileSystemEntry.from_stat(path, os.stat(path))
+
+
+def scan_folder(folder: FileSystemEntry, skip_symlinks: bool = False
+                ) -> Tuple[List[FileSystemEntry], List[FileSystemEntry]]:
+    """
+    Get entries of the folder with a single stat call per entry. Symlinks
+    are listed as entries of their targets like os.walk does, broken
+    symlinks as files
+    :param folder: Folder entry
+    :param skip_symlinks: Whether to skip symlinks
+    :return: Subfolders and files entries in order of scanning
+    """
+    subfolders = []
+    files = []
+    try:
+        with os.scandir(folder.path) as scanner:
+            for dir_entry in scanner:
+                try:
+                    is_symlink = dir_entry.is_symlink()
+                    if is_symlink and skip_symlinks:
+                        continue
+                    try:
+                        stat_result = dir_entry.stat()
+                    except FileNotFoundError:
+                        if not is_symlink:
+                            raise
+                        stat_result = dir_entry.stat(follow_symlinks=False)
+                    entry = FileSystemEntry.from_stat(
+                        dir_entry.path, stat_result, is_symlink)
+                except OSError as err:
+                    logger.warning(f'Checking {dir_entry.path} failed:\n{err}')
+                    continue
+                if entry.is_dir:
+                    subfolders.append(entry)
+                else:
+                    files.append(entry)
+    except OSError as err:
+        logger.warning(f'Scanning {folder.path} failed:\n{err}')
+    return subfolders, files
+
+
+def walk_tree(root_path: str, follow_symlinks: Optional[bool] = None,
+              same_filesystem: Optional[bool] = None,
+              skip_symlinks: Optional[bool] = None
+              ) -> Iterator['FolderEntries']:
+    """
+    Get every walked folder with its subfolders and files entries like
+    os.walk does, folders are walked in depth first order
+    :param root_path: Folder path
+    :param follow_symlinks: Whether to walk folders symlinks lead to,
+    FileReaderConfig.follow_symlinks by default
+    :param same_filesystem: Whether to skip subfolders on other file systems,
+    FileReaderConfig.same_filesystem by default
+    :param skip_symlinks: Whether to skip symlinks, they are not listed
+    then, FileReaderConfig.skip_symlinks by default
+    :return: Folder, its subfolders and files entries in order of scanning.
+    Skipped subfolders are listed, but not walked
+    """
+    if follow_symlinks is None:
+        follow_symlinks = FileReaderConfig.follow_symlinks
+    if same_filesystem is None:
+        same_filesystem = FileReaderConfig.same_filesystem
+    if skip_symlinks is None:
+        skip_symlinks = FileReaderConfig.skip_symlinks
+
+    root = get_entry(root_path)
+    # Folders reached through symlinks can lead back to walked folders
+    visited: Set[Tuple[int, int]] = {(root.device, root.inode)}
+    yield from walk_stack([root], root, visited, follow_symlinks,
+                          same_filesystem, skip_symlinks)
+
+
+def is_walked(subfolder: FileSystemEntry, root: FileSystemEntry,
+              follow_symlinks: bool, same_filesystem: bool) -> bool:
+    """
+    Check if the subfolder is walked or only listed
+    :param subfolder: Subfolder entry
+    :param root: Entry of the walked folder
+    :param follow_symlinks: Whether to walk folders symlinks lead to
+    :param same_filesystem: Whether to skip subfolders on other file systems
+    :return: Whether the subfolder is walked
+    """
+    if subfolder.is_symlink and not follow_symlinks:
+        return False
+    return not same_filesystem or subfolder.device == root.device
+
+
+def push_subfolders(stack: List[FileSystemEntry],
+                    subfolders: List[FileSystemEntry], root: FileSystemEntry,
+                    visited: Set[Tuple[int, int]], follow_symlinks: bool,
+                    same_filesystem: bool) -> None:
+    """
+    Add subfolders to walk to the stack of folders, the first subfolder goes
+    on top
+    :param stack: Folders to walk, the last one is walked first
+    :param subfolders: Subfolders entries in order of scanning
+    :param root: Entry of the walked folder
+    :param visited: Device and inode numbers of folders added to the stack
+    :param follow_symlinks: Whether to walk folders symlinks lead to
+    :param same_filesystem: Whether to skip subfolders on other file systems
+    """
+    for subfolder in reversed(subfolders):
+        if not is_walked(subfolder, root, follow_symlinks, same_filesystem):
+            continue
+        key = (subfolder.device, subfolder.inode)
+        if key in visited:
+            continue
+        visited.add(key)
+        stack.append(subfolder)
+
+
+def walk_stack(stack: List[FileSystemEntry], root: FileSystemEntry,
+               visited: Set[Tuple[int, int]], follow_symlinks: bool,
+               same_filesystem: bool, skip_symlinks: bool
+               ) -> Iterator['FolderEntries']:
+    """
+    Walk folders of the stack and their subfolders in depth first order
+    :param stack: Folders to walk, the last one is walked first
+    :param root: Entry of the walked folder
+    :param visited: Device and inode numbers of folders added to the stack
+    :param follow_symlinks: Whether to walk folders symlinks lead to
+    :param same_filesystem: Whether to skip subfolders on other file systems
+    :param skip_symlinks: Whether to skip symlinks
+    :return: Folder, its subfolders and files entries in order of scanning
+    """
+    while stack:
+        folder = stack.pop()
+        subfolders, files = scan_folder(folder, skip_symlinks)
+        yield folder, subfolders, files
+        push_subfolders(stack, subfolders, root, visited, follow_symlinks,
+                        same_filesystem)
+
+
+def walk(root_path: str, follow_symlinks: Optional[bool] = None,
+         same_filesystem: Optional[bool] = None,
+         skip_symlinks: Optional[bool] = None
+         ) -> Iterator[FileSystemEntry]:
+    """
+    Get entries of the folder and all its subfolders in the same order as
+    os.walk lists them: the folder itself, then subfolders and files of every
+    folder with subfolders walked in depth first order
+    :param root_path: Folder path
+    :param follow_symlinks: Whether to walk folders symlinks lead to,
+    FileReaderConfig.follow_symlinks by default
+    :param same_filesystem: Whether to skip subfolders on other file systems,
+    FileReaderConfig.same_filesystem by default
+    :param skip_symlinks: Whether to skip symlinks, they are not listed
+    then, FileReaderConfig.skip_symlinks by default
+    :return: File system entries
+    """
+    return iter_entries(walk_tree(root_path, follow_symlinks, same_filesystem,
+                                  skip_symlinks))
+
+
+def iter_entries(tree: Iterable['FolderEntries']
+                 ) -> Iterator[FileSystemEntry]:
+    """
+    Get entries of walked folders in order of walk function
+    :param tree: Walked folders with their subfolders and files, the root
+    folder goes first
+    :return: File system entries
+    """
+    for index, (folder, subfolders, files) in enumerate(tree):
+        if not index:
+            yield folder
+        yield from subfolders
+        yield from files
+
+
+def walk_after(root_path: str, last_path: str,
+               follow_symlinks: Optional[bool] = None,
+               same_filesystem: Optional[bool] = None,
+               skip_symlinks: Optional[bool] = None
+               ) -> Iterator[FileSystemEntry]:
+    """
+    Get entries walk function lists after the entry of the path. Only
+    folders on the way from the folder to the path are scanned to find where
+    the walk stopped, folders listed before the path are not walked again
+    unless symlinks are followed: then their subfolders are scanned again to
+    skip the same folders symlinks lead to as walk skips
+    :param root_path: Folder path
+    :param last_path: Path of the last listed entry
+    :param follow_symlinks: Whether to walk folders symlinks lead to,
+    FileReaderConfig.follow_symlinks by default
+    :param same_filesystem: Whether to skip subfolders on other file systems,
+    FileReaderConfig.same_filesystem by default
+    :param skip_symlinks: Whether to skip symlinks, they are not listed
+    then, FileReaderConfig.skip_symlinks by default
+    :return: File system entries
+    """
+    if follow_symlinks is None:
+        follow_symlinks = FileReaderConfig.follow_symlinks
+    if same_filesystem is None:
+        same_filesystem = FileReaderConfig.same_filesystem
+    if skip_symlinks is None:
+        skip_symlinks = FileReaderConfig.skip_symlinks
+
+    names = []
+    if last_path != root_path:
+        relative_path = os.path.relpath(last_path, root_path)
+        names = relative_path.split(os.sep)
+        if os.path.isabs(relative_path) or os.pardir in names:
+            raise ValueError(f'{last_path} is not under {root_path}.')
+
+    root = get_entry(root_path)
+    visited: Set[Tuple[int, int]] = {(root.device, root.inode)}
+    stack: List[FileSystemEntry] = []
+    folder = root
+    subfolders, files = scan_folder(folder, skip_symlinks)
+    remaining = subfolders + files
+    for depth, name in enumerate(names):
+        entries = subfolders + files
+        path = os.path.join(folder.path, name)
+        position = next((position for position, entry in enumerate(entries)
+                         if entry.path == path), None)
+        if position is None:
+            raise ValueError(f'{last_path} is not listed anymore.')
+        if depth == len(names) - 1:
+            remaining = entries[position + 1:]
+            break
+        # Subfolders are added to the stack like walk_tree adds them, the
+        # ones listed after the way to the path are walked after it
+        push_subfolders(stack, subfolders, root, visited, follow_symlinks,
+                        same_filesystem)
+        folder = entries[position]
+        if all(entry is not folder for entry in stack):
+            raise ValueError(f'{last_path} is not listed.')
+        while True:
+            walked = stack.pop()
+            if walked is folder:
+                break
+            if follow_symlinks:
+                # Symlinks in folders walked before the way to the path can
+                # lead to folders walked after it, those are skipped then
+                walked_subfolders, _ = scan_folder(walked, skip_symlinks)
+                push_subfolders(stack, walked_subfolders, root, visited,
+                                follow_symlinks, same_filesystem)
+        subfolders, files = scan_folder(folder, skip_symlinks)
+    push_subfolders(stack, subfolders, root, visited, follow_symlinks,
+                    same_filesystem)
+
+    yield from remaining
+    for _, subfolders, files in walk_stack(stack, root, visited,
+                                           follow_symlinks, same_filesystem,
+                                           skip_symlinks):
+        yield from subfolders
+        yield from files
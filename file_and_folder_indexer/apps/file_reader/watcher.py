@@ -0,0 +1,270 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+from file_and_folder_indexer.apps.file_reader.apps import FileReaderConfig
+from file_and_folder_indexer.apps.file_reader.indexer import (
+    collect_folder_statistics, get_parseable_files, index_files, is_parseable)
+from file_and_folder_indexer.apps.file_reader.storage import (
+    delete_file_indexes, delete_folder_indexes, load_indexed_paths)
+from file_and_folder_indexer.apps.file_reader.walker import get_entry, walk
+
+# inotify(7) event flags
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+# Events changing files contents or folders entries. Files kept open, like
+# logs, are only modified, every write of them is reported, so writes made
+# within the watch interval are refreshed together
+WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+# Watch descriptor, mask, cookie and name length of inotify_event struct
+EVENT_HEADER = struct.Struct('iIII')
+EVENTS_BUFFER_SIZE = 64 * 1024
+logger = logging.getLogger(__name__)
+
+
+def refresh(path: str, workers: int = 1) -> None:
+    """
+    Bring indexes of the file or of all files under the folder up to date:
+    read changed files and drop indexes of deleted ones
+    :param path: File or folder path
+    :param workers: Max number of worker processes to read files with
+    """
+    try:
+        entry = get_entry(path)
+    except OSError:
+        entry = None
+
+    if entry is not None and entry.is_dir:
+        files = get_parseable_files(walk(path))
+        index_files(files, workers)
+        paths = {file.path for file in files}
+        delete_file_indexes(indexed_path
+                            for indexed_path in load_indexed_paths(path)
+                            if indexed_path not in paths)
+    elif entry is not None and is_parseable(entry):
+        index_files([entry], workers)
+    else:
+        # Path is deleted or is not a text file anymore
+        delete_file_indexes([path] + load_indexed_paths(path))
+        delete_folder_indexes(path)
+
+
+def is_subpath(path: str, folder: str) -> bool:
+    """
+    Check if path is the folder or lies under it
+    :param path: Path to check
+    :param folder: Folder path
+    :return: Whether path is under the folder
+    """
+    return path == folder or path.startswith(os.path.join(folder, ''))
+
+
+def collapse_paths(paths: Iterable[str]) -> List[str]:
+    """
+    Drop paths lying under other paths, they are refreshed together with
+    the folder
+    :param paths: Changed paths
+    :return: Paths to refresh in sorted order
+    """
+    collapsed = []
+    for path in sorted(paths):
+        if collapsed and is_subpath(path, collapsed[-1]):
+            continue
+        collapsed.append(path)
+    return collapsed
+
+
+class PollingWatcher:
+    """Reports all watched folders as changed every interval seconds, so
+    changed files are found by comparing their signatures with the index"""
+
+    def __init__(self, roots: List[str], interval: float) -> None:
+        self.roots = roots
+        self.interval = interval
+
+    def wait(self) -> Set[str]:
+        """
+        Wait for the next check of watched folders
+        :return: Paths to refresh
+        """
+        time.sleep(self.interval)
+        return set(self.roots)
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """Reports files and folders changed under watched folders with Linux
+    inotify, every folder of the tree has its own watch"""
+
+    def __init__(self, roots: List[str], interval: float,
+                 follow_symlinks: Optional[bool] = None) -> None:
+        if not sys.platform.startswith('linux'):
+            raise OSError('inotify is available only on Linux.')
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'),
+                                use_errno=True)
+        self.roots = roots
+        self.interval = interval
+        if follow_symlinks is None:
+            follow_symlinks = FileReaderConfig.follow_symlinks
+        self.mask = WATCH_MASK | IN_ONLYDIR
+        if not follow_symlinks:
+            self.mask |= IN_DONT_FOLLOW
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        # Watched folders paths by watch descriptor
+        self.folders: Dict[int, str] = {}
+        for root in roots:
+            self.add_tree(root)
+
+    def add_folder(self, path: str) -> None:
+        """
+        Watch entries of the folder
+        :param path: Folder path
+        """
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path),
+                                         self.mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            logger.warning(f'Watching {path} failed:\n{os.strerror(errno)}')
+            return
+        # Moved folder keeps its watch descriptor, so the path is updated
+        self.folders[wd] = path
+
+    def add_tree(self, path: str) -> None:
+        """
+        Watch the folder and all its subfolders
+        :param path: Folder path
+        """
+        try:
+            for entry in walk(path):
+                if entry.is_dir:
+                    self.add_folder(entry.path)
+        except OSError as err:
+            logger.warning(f'Watching {path} failed:\n{err}')
+
+    def read_events(self, timeout: Optional[float]) -> Set[str]:
+        """
+        Read events available in the timeout
+        :param timeout: Seconds to wait for events, wait until the first
+        event if None
+        :return: Changed files and folders paths
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = os.read(self.fd, EVENTS_BUFFER_SIZE)
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped, so every watched folder is checked
+                changed.update(self.roots)
+                continue
+            folder = self.folders.get(wd)
+            if folder is None:
+                continue
+            if mask & IN_IGNORED:
+                del self.folders[wd]
+                continue
+            path = os.path.join(folder, name) if name else folder
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                self.add_tree(path)
+            changed.add(path)
+        return changed
+
+    def wait(self) -> Set[str]:
+        """
+        Wait for changes, changes made within interval seconds after the
+        first one, like copying a folder, are gathered together
+        :return: Paths to refresh
+        """
+        changed = self.read_events(None)
+        deadline = time.monotonic() + self.interval
+        while True:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                return changed
+            changed.update(self.read_events(timeout))
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def create_watcher(roots: List[str], polling: bool = False,
+                   interval: Optional[float] = None):
+    """
+    Get inotify watcher of the folders or polling one if inotify is not
+    available
+    :param roots: Folders paths
+    :param polling: Whether to poll folders even if inotify is available
+    :param interval: Seconds between polls or to gather changes for,
+    FileReaderConfig.watch_interval by default
+    :return: Watcher
+    """
+    interval = interval or FileReaderConfig.watch_interval
+    if not polling:
+        try:
+            return InotifyWatcher(roots, interval)
+        except (OSError, AttributeError) as err:
+            logger.warning(f'inotify is not available, folders are polled '
+                           f'instead:\n{err}')
+    return PollingWatcher(roots, interval)
+
+
+def watch(roots: List[str], polling: bool = False,
+          interval: Optional[float] = None,
+          workers: Optional[int] = None) -> None:
+    """
+    Index files and folders and keep indexes up to date until interrupted
+    :param roots: Folders paths
+    :param polling: Whether to poll folders even if inotify is available
+    :param interval: Seconds between polls or to gather changes for,
+    FileReaderConfig.watch_interval by default
+    :param workers: Max number of worker processes to read files with,
+    FileReaderConfig.workers by default
+    """
+    workers = workers or FileReaderConfig.workers
+    # Watching starts before indexing, so no change is missed meanwhile
+    watcher = create_watcher(roots, polling, interval)
+    try:
+        for root in roots:
+            collect_folder_statistics(root, workers)
+            logger.info(f'Indexed {root}')
+        while True:
+            paths = collapse_paths(watcher.wait())
+            for path in paths:
+                refresh(path, workers)
+                logger.info(f'Refreshed {path}')
+            # Only folders on the way from changed paths to the root are
+            # merged again
+            for root in roots:
+                if any(is_subpath(path, root) for path in paths):
+                    collect_folder_statistics(root, workers)
+    finally:
+        watcher.close()
@@ -62,6 +62,11 @@ LOGGING = {
             "handlers": ["console"],
             "propagate": True,
         },
+        "file_and_folder_indexer": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
     },
 }
 
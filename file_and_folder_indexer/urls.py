@@ -19,8 +19,9 @@ from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 
 from file_and_folder_indexer import views
-from file_and_folder_indexer.apps.file_reader.urls import \
-    filesystem_urlpatterns
+from file_and_folder_indexer.apps.file_reader.urls import (
+    async_filesystem_urlpatterns, filesystem_urlpatterns, jobs_urlpatterns,
+    metrics_urlpatterns)
 
 schema_view = get_schema_view(
     openapi.Info(
@@ -36,11 +37,14 @@ schema_view = get_schema_view(
 api_urlpatterns = [
     path('', views.api),
     path('filesystem/', include(filesystem_urlpatterns)),
+    path('async/filesystem/', include(async_filesystem_urlpatterns)),
+    path('jobs/', include(jobs_urlpatterns)),
 ]
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include(api_urlpatterns)),
+    path('metrics', include(metrics_urlpatterns)),
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0),
          name='schema-swagger-ui'),
 ]